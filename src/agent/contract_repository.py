@@ -1,7 +1,8 @@
 import json
 from src.db_class.mysql_connector import MySQLConnector
 from typing import List, Dict, Any
-import aiomysql
+import asyncmy
+from asyncmy.cursors import DictCursor
 
 class ContractRepository:
     def __init__(self, connector: MySQLConnector):
@@ -13,7 +14,7 @@ class ContractRepository:
 
         pool = await self.connector.init_pool()
         async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
+            async with conn.cursor(DictCursor) as cur:
                 await cur.execute(query)
                 results = await cur.fetchall()
         
@@ -21,8 +21,25 @@ CONTRACT_ANALYZER_MODEL_API_KEY = os.getenv("CONTRACT_ANALYZER_MODEL_API_KEY")
 CONTRACT_ANALYZER_MODEL_API_PROXY_URL = os.getenv("CONTRACT_ANALYZER_MODEL_API_PROXY_URL", "")
 # Таймаут для LLM-модели (в секундах), т.к. анализ кода может быть долгим
 CONTRACT_ANALYZER_MODEL_TIMEOUT = int(os.getenv("CONTRACT_ANALYZER_MODEL_TIMEOUT"))
+# Сколько запросов к LLM-анализатору может выполняться одновременно
+CONTRACT_ANALYZER_MODEL_MAX_CONCURRENCY = int(os.getenv("CONTRACT_ANALYZER_MODEL_MAX_CONCURRENCY", 1))
+# Лимит запросов в минуту к модели анализа контрактов (RPM провайдера). 0 - без ограничения
+CONTRACT_ANALYZER_MODEL_RPM = float(os.getenv("CONTRACT_ANALYZER_MODEL_RPM", 0))
+# Явная разметка системного промпта для кэширования (cache_control), нужна Anthropic-совместимым API
+CONTRACT_ANALYZER_MODEL_PROMPT_CACHE_CONTROL = os.getenv("CONTRACT_ANALYZER_MODEL_PROMPT_CACHE_CONTROL", "False").lower() == 'true'
+# Structured outputs (response_format: json_schema). Выключено по умолчанию: поддерживают не все провайдеры
+CONTRACT_ANALYZER_MODEL_STRUCTURED_OUTPUT = os.getenv("CONTRACT_ANALYZER_MODEL_STRUCTURED_OUTPUT", "False").lower() == 'true'
+# Максимальная длина исходного кода, отправляемого в LLM (символов). 0 - без ограничения
+CONTRACT_ANALYZER_MAX_SOURCE_CHARS = int(os.getenv("CONTRACT_ANALYZER_MAX_SOURCE_CHARS", 120000))
 
 EVM_API_REQUEST_DELAY = float(os.getenv("EVM_API_REQUEST_DELAY", 2.0))
+EVM_API_REQUEST_BURST = int(os.getenv("EVM_API_REQUEST_BURST", 1))
+
+# Лимиты общего пула HTTP-соединений (один пул на каждый прокси)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+# Максимум одновременных запросов к одному API-хосту (Etherscan, Moralis)
+EVM_API_HOST_MAX_CONCURRENCY = int(os.getenv("EVM_API_HOST_MAX_CONCURRENCY", 5))
 
 EVM_API_URL = os.getenv("EVM_API_URL")
 EVM_API_KEY = os.getenv("EVM_API_KEY")
@@ -87,6 +104,19 @@ EVM_GET_TOKEN_METADATA_API_PROXY_URL = os.getenv("EVM_GET_TOKEN_METADATA_API_PRO
 _abi_keywords_str = os.getenv("AIRDROP_ABI_KEYWORDS", "airdrop,claim,iseligible,merkle,proof,eligible")
 AIRDROP_ABI_KEYWORDS = [keyword.strip().lower() for keyword in _abi_keywords_str.split(',')]
 
+# Кэш успешных отчетов Slither в памяти (по хэшу исходного кода). 0 - отключен
+SLITHER_RESULT_CACHE_MB = int(os.getenv("SLITHER_RESULT_CACHE_MB", 256))
+SLITHER_RESULT_CACHE_TTL = int(os.getenv("SLITHER_RESULT_CACHE_TTL", 86400))
+# Версии solc, заранее установленные через solc-select (см. Dockerfile). Пусто - только глобальная версия
+_slither_solc_versions_str = os.getenv("SLITHER_SOLC_VERSIONS", "")
+SLITHER_SOLC_VERSIONS = [v.strip() for v in _slither_solc_versions_str.split(',') if v.strip()]
+# Число долгоживущих процессов Slither. 0 - отдельный процесс `slither` на каждый контракт
+SLITHER_WORKERS = int(os.getenv("SLITHER_WORKERS", 2))
+# Максимальное время одного прогона Slither (секунды); зависший процесс убивается
+SLITHER_TIMEOUT = int(os.getenv("SLITHER_TIMEOUT", 300))
+# Число прогонов, после которого процесс Slither перезапускается (от утечек памяти). 0 - без перезапуска
+SLITHER_WORKER_MAX_JOBS = int(os.getenv("SLITHER_WORKER_MAX_JOBS", 200))
+
 APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
 APP_PORT = int(os.getenv("APP_PORT", 8000))
 
@@ -3,7 +3,7 @@ import logging
 import json
 import time
 from typing import Dict, Any, List
-import aiomysql
+import asyncmy
 
 from ..db_class.repositories.evm_contract_date_scanner_repository import EvmContractDateScannerRepository
 from ..providers.api_client_interface import AbstractAPIClient
@@ -2,14 +2,15 @@ import asyncio
 import logging
 import json
 from typing import Dict, Any, Optional
-import aiomysql
+import asyncmy
+from cachetools import TTLCache
 
 from ..db_class.repositories.evm_contract_source_scanner_repository import EvmContractSourceScannerRepository
 from ..utils.abi_filter import AirdropABIFilter
 from ..utils.slither_analyzer import SlitherAnalyzer
-from ..utils.llm_airdrop_analyzer import LLMAirdropAnalyzer
+from ..utils.llm_airdrop_analyzer import LLMAirdropAnalyzer, NOT_AIRDROP
 from .. import services 
-from ..utils.contract_utils import get_function_selector, decode_address_from_eth_call
+from ..utils.contract_utils import get_function_selector, decode_address_from_eth_call, source_code_hash
 from ..providers.moralis_api_client import MoralisAPIError 
 
 logger = logging.getLogger(__name__)
@@ -24,13 +25,17 @@ class EvmContractSourceScanner:
                  abi_filter: AirdropABIFilter,
                  slither_analyzer: SlitherAnalyzer,
                  llm_analyzer: LLMAirdropAnalyzer,
-                 batch_size: int):
+                 batch_size: int,
+                 negative_cache_size: int = 100_000,
+                 negative_cache_ttl: int = 86400):
         
         self._repository = repository
         self._abi_filter = abi_filter
         self._slither = slither_analyzer
         self._llm_analyzer = llm_analyzer
         self._batch_size = batch_size
+        # Хэши исходников, которые LLM недавно признал не-Airdrop'ом (повтор шаблонов, форков и т.д.)
+        self._llm_negative_cache: TTLCache = TTLCache(maxsize=negative_cache_size, ttl=negative_cache_ttl)
         self._eth_call_client = services.api_client_get_token 
         self._token_metadata_client = services.api_client_token_metadata
         logger.info("EvmContractSourceScanner initialized.")
@@ -49,7 +54,11 @@ class EvmContractSourceScanner:
                 source_ids = [s['id'] for s in sources_to_scan]
                 await self._repository.batch_update_source_processing_status(conn, source_ids, 1)
                 tasks = [self._process_source(conn, source) for source in sources_to_scan]
-                await asyncio.gather(*tasks)
+                results = await asyncio.gather(*tasks)
+                # Найденные Airdrop-контракты сохраняем одной пачкой
+                airdrop_rows = [row for row in results if row]
+                if airdrop_rows:
+                    await self._repository.save_airdrop_contracts(conn, airdrop_rows)
                 logger.info(f"EvmContractSourceScanner: Successfully processed batch of {len(sources_to_scan)} sources.")
                 await conn.commit()
             except Exception as e:
@@ -57,9 +66,12 @@ class EvmContractSourceScanner:
                 logger.error(f"EvmContractSourceScanner: Failed to process source batch. Transaction rolled back. Error: {e}", exc_info=True)
 
 
-    async def _process_source(self, conn: aiomysql.Connection, source: Dict[str, Any]):
+    async def _process_source(self, conn: asyncmy.Connection, source: Dict[str, Any]) -> Optional[tuple]:
         """
         Выполняет полный 5-этапный анализ одного исходного кода.
+        
+        :return: Строка для вставки в evm_airdrop_eligibility_contract, 
+                 если это Airdrop, иначе None.
         """
         source_id = source['id']
         contract_address = source['contract_address']
@@ -73,32 +85,46 @@ class EvmContractSourceScanner:
             await self._repository.batch_update_source_processing_status(conn, [source_id], 2)
             return
 
-        logger.debug(f"Source_id={source_id}: Passed ABI filter. Running Slither...")
+        # Этот исходник уже был признан LLM не-Airdrop'ом недавно - повторно не анализируем
+        source_hash = source_code_hash(source['source_code'])
+        if source_hash in self._llm_negative_cache:
+            logger.info(f"Source_id={source_id}: Same source code was recently rejected by LLM. Skipping analysis.")
+            await self._repository.batch_update_source_processing_status(conn, [source_id], 2)
+            return
+
+        logger.debug(f"Source_id={source_id}: Passed ABI filter. Running LLM analysis...")
+
+        # --- ЭТАП 2: Анализ LLM (до Slither: большинство контрактов отсеивается здесь) ---
+        llm_result = await self._llm_analyzer.analyze_contract(source['source_code'], source['abi'])
+        
+        if not llm_result:
+            if llm_result is NOT_AIRDROP:
+                logger.info(f"Source_id={source_id}: LLM analysis determined this is NOT a valid airdrop contract.")
+                # Кэшируем только явный вердикт модели: пустой или некорректный ответ может быть случайным
+                self._llm_negative_cache[source_hash] = True
+            else:
+                logger.warning(f"Source_id={source_id}: LLM returned no usable verdict. Result is not cached.")
+            await self._repository.batch_update_source_processing_status(conn, [source_id], 2)
+            return
+
+        logger.debug(f"Source_id={source_id}: LLM found airdrop logic. Running Slither...")
 
-        # --- ЭТАП 2: Анализ Slither ---
+        # --- ЭТАП 3: Анализ Slither (только для Airdrop-кандидатов) ---
         slither_report_json = await self._slither.analyze_source_code(source['source_code'])
         if not slither_report_json:
             logger.error(f"Slither returned no report for source_id={source_id}. Rolling back.")
             raise ValueError(f"Slither returned no report for source_id={source_id}")
             
-        (security_status, slither_report_str) = self._slither.classify_slither_report(slither_report_json)
+        (security_status, slither_report) = self._slither.classify_slither_report(slither_report_json)
         # Сохраняем отчет Slither в evm_contract_source
-        await self._repository.save_slither_report(conn, source_id, security_status, slither_report_str)
+        await self._repository.save_slither_report(conn, source_id, security_status, slither_report())
         
-        # --- ЭТАП 3: Анализ LLM (Только для "безопасных") ---
+        # Небезопасные контракты дальше не обрабатываем
         if security_status not in [4, 5]: 
-            logger.info(f"Source_id={source_id}: Skipping LLM analysis due to Slither status: {security_status}.")
+            logger.info(f"Source_id={source_id}: Skipping airdrop contract due to Slither status: {security_status}.")
             await self._repository.batch_update_source_processing_status(conn, [source_id], 2)
             return 
 
-        logger.debug(f"Source_id={source_id}: Passed Slither (status={security_status}). Running LLM analysis...")
-        llm_result = await self._llm_analyzer.analyze_contract(source['source_code'], source['abi'])
-        
-        if not llm_result:
-            logger.info(f"Source_id={source_id}: LLM analysis determined this is NOT a valid airdrop contract.")
-            await self._repository.batch_update_source_processing_status(conn, [source_id], 2)
-            return
-
         # --- ЭТАП 4: Получение адреса токена (eth_call) ---
         token_address = llm_result.get('token_address')
         
@@ -134,11 +160,10 @@ class EvmContractSourceScanner:
         else:
              logger.warning(f"Source_id={source_id}: Skipping token metadata fetch because token_address is missing.")
 
-        # --- ЭТАП 6: Сохранение результата Airdrop ---
-        logger.info(f"Source_id={source_id}: SUCCESS! Found Airdrop contract. Saving to DB.")
+        # --- ЭТАП 6: Подготовка результата Airdrop (сохраняется пачкой в run) ---
+        logger.info(f"Source_id={source_id}: SUCCESS! Found Airdrop contract. Queued for saving to DB.")
         
-        await self._repository.save_airdrop_contract(
-            conn, 
+        return self._repository.build_airdrop_contract_row(
             source, 
             llm_result, 
             token_metadata
@@ -1,7 +1,7 @@
 import asyncio
 import logging
 from typing import Dict, Any, List, Tuple
-import aiomysql
+import asyncmy
 
 from ..db_class.repositories.evm_scanner_repository import EvmScannerRepository
 from ..providers.api_client_interface import AbstractAPIClient
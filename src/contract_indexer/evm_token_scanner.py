@@ -2,7 +2,7 @@ import asyncio
 import logging
 import json
 from typing import Dict, Any, Optional
-import aiomysql
+import asyncmy
 
 from ..db_class.repositories.evm_token_scanner_repository import EvmTokenScannerRepository
 from ..utils.slither_analyzer import SlitherAnalyzer
@@ -41,7 +41,7 @@ class EvmTokenScanner:
                 await conn.rollback()
                 logger.error(f"EvmTokenScanner: Failed to process tokens batch. Transaction rolled back. Error: {e}", exc_info=True)
 
-    async def _process_token(self, conn: aiomysql.Connection, token: Dict[str, Any]):
+    async def _process_token(self, conn: asyncmy.Connection, token: Dict[str, Any]):
         token_data_id = token['id']
         token_address = token['token_address']
         chain_id = token['evm_network_chain_id']
@@ -100,7 +100,8 @@ class EvmTokenScanner:
                 logger.error(f"EvmTokenScanner: Slither returned no report for token_data_id={token_data_id}. Rolling back.")
                 raise ValueError(f"EvmTokenScanner: Slither returned no report for token_data_id={token_data_id}")
 
-            (security_status, slither_report_str) = self._slither.classify_slither_report(slither_report_json)
+            # Строковый отчет здесь не нужен: сохраняется token_security_report
+            (security_status, _) = self._slither.classify_slither_report(slither_report_json)
 
             token_security_report.append(
                 {
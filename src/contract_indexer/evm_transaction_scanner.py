@@ -1,7 +1,7 @@
 import asyncio
 import logging
 from typing import Dict, Any
-import aiomysql
+import asyncmy
 import json  
 
 from ..db_class.repositories.evm_transaction_scanner_repository import EvmTransactionScannerRepository
@@ -41,7 +41,7 @@ class EvmTransactionScanner:
                 logger.error(f"EvmTransactionScanner: Failed to process transaction batch. Transaction rolled back. Error: {e}", exc_info=True)
 
 
-    async def _process_transaction(self, conn: aiomysql.Connection, tx: Dict[str, Any]):
+    async def _process_transaction(self, conn: asyncmy.Connection, tx: Dict[str, Any]):
         tx_id = tx['id']
         chain_id = tx['evm_network_chain_id']
         tx_hash = tx['transaction_hash']
@@ -1,5 +1,5 @@
 from typing import Optional
-import aiomysql
+import asyncmy
 from .mysql_connector import MySQLConnector
 
 class BaseRepository:
@@ -15,15 +15,15 @@ class BaseRepository:
         :param connector: Экземпляр MySQLConnector для получения пула соединений.
         """
         self._connector = connector
-        self._pool: Optional[aiomysql.Pool] = None
+        self._pool: Optional[asyncmy.Pool] = None
 
-    async def _get_pool(self) -> aiomysql.Pool:
+    async def _get_pool(self) -> asyncmy.Pool:
         """Ленивая инициализация пула, если он еще не получен."""
         if self._pool is None:
             self._pool = await self._connector.get_pool()
         return self._pool
 
     @property
-    async def pool(self) -> aiomysql.Pool:
+    async def pool(self) -> asyncmy.Pool:
         """Публичное свойство для доступа к пулу соединений."""
         return await self._get_pool()
\ No newline at end of file
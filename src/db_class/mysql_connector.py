@@ -1,5 +1,5 @@
 from typing import Optional
-import aiomysql
+import asyncmy
 from ..config import MYSQL_HOST, MYSQL_DATABASE, MYSQL_USER, MYSQL_PASSWORD, MYSQL_PORT
 
 class MySQLConnector:
@@ -19,23 +19,23 @@ class MySQLConnector:
         self.maxsize = maxsize
         self.autocommit = autocommit
 
-        self._pool: Optional[aiomysql.Pool] = None
+        self._pool: Optional[asyncmy.Pool] = None
 
-    async def init_pool(self) -> aiomysql.Pool:
+    async def init_pool(self) -> asyncmy.Pool:
         if self._pool is None:
-            self._pool = await aiomysql.create_pool(
+            self._pool = await asyncmy.create_pool(
                 host=self.host,
                 port=self.port,
                 user=self.user,
                 password=self.password,
-                db=self.db,
+                database=self.db,
                 minsize=self.minsize,
                 maxsize=self.maxsize,
                 autocommit=self.autocommit,
             )
         return self._pool
     
-    async def get_pool(self) -> aiomysql.Pool:
+    async def get_pool(self) -> asyncmy.Pool:
         if self._pool is None:
             raise RuntimeError("The connection pool has not been initialized. Call init_pool() first.")
         return self._pool
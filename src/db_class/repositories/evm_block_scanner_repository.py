@@ -1,6 +1,7 @@
 import logging
 from typing import List, Dict, Any, Tuple
-import aiomysql
+import asyncmy
+from asyncmy.cursors import DictCursor
 from ..base_repository import BaseRepository
 
 logger = logging.getLogger(__name__)
@@ -12,7 +13,7 @@ class EvmBlockScannerRepository(BaseRepository):
     и записью в evm_block_create_contract_transaction.
     """
 
-    async def lock_and_get_unprocessed_blocks(self, conn: aiomysql.Connection, batch_size: int) -> List[Dict[str, Any]]:
+    async def lock_and_get_unprocessed_blocks(self, conn: asyncmy.Connection, batch_size: int) -> List[Dict[str, Any]]:
         """
         Выбирает и атомарно блокирует (SELECT ... FOR UPDATE) 
         пачку необработанных блоков.
@@ -25,11 +26,11 @@ class EvmBlockScannerRepository(BaseRepository):
             FOR UPDATE SKIP LOCKED
         """
         
-        async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with conn.cursor(DictCursor) as cursor:
             await cursor.execute(sql, (batch_size,))
             return await cursor.fetchall()
 
-    async def batch_update_block_status(self, conn: aiomysql.Connection, block_ids: List[int], status: int):
+    async def batch_update_block_status(self, conn: asyncmy.Connection, block_ids: List[int], status: int):
         """
         Массово обновляет 'processing_status' для списка ID блоков.
         """
@@ -44,7 +45,7 @@ class EvmBlockScannerRepository(BaseRepository):
         async with conn.cursor() as cursor:
             await cursor.execute(sql, params)
 
-    async def batch_insert_contract_txs(self, conn: aiomysql.Connection, txs_data: List[Tuple[int, int, str]]):
+    async def batch_insert_contract_txs(self, conn: asyncmy.Connection, txs_data: List[Tuple[int, int, str]]):
         """
         Выполняет массовую вставку транзакций создания контрактов.
         """
@@ -59,7 +60,7 @@ class EvmBlockScannerRepository(BaseRepository):
         async with conn.cursor() as cursor:
             await cursor.executemany(sql, txs_data)
 
-    async def mark_block_as_completed(self, conn: aiomysql.Connection, block_id: int):
+    async def mark_block_as_completed(self, conn: asyncmy.Connection, block_id: int):
         """
         Помечает ОДИН блок как полностью обработанный (status = 2).
         """
@@ -71,7 +72,7 @@ class EvmBlockScannerRepository(BaseRepository):
         async with conn.cursor() as cursor:
             await cursor.execute(sql, (block_id,))
             
-    async def mark_blocks_as_completed_batch(self, conn: aiomysql.Connection, block_ids: List[int]):
+    async def mark_blocks_as_completed_batch(self, conn: asyncmy.Connection, block_ids: List[int]):
         """
         Массово помечает список блоков как полностью обработанные (status = 2).
         """
@@ -1,6 +1,7 @@
 import logging
 from typing import List, Dict, Any, Optional
-import aiomysql
+import asyncmy
+from asyncmy.cursors import DictCursor
 from ..base_repository import BaseRepository
 
 logger = logging.getLogger(__name__)
@@ -48,7 +49,7 @@ class EvmContractDateScannerRepository(BaseRepository):
               AND claim_end_timestamp IS NULL
         """
         async with (await self.pool).acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+            async with conn.cursor(DictCursor) as cursor:
                 await cursor.execute(sql)
                 return await cursor.fetchall()
             
@@ -64,7 +65,7 @@ class EvmContractDateScannerRepository(BaseRepository):
               AND claim_start_getter_abi IS NOT NULL
         """
         async with (await self.pool).acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+            async with conn.cursor(DictCursor) as cursor:
                 await cursor.execute(sql)
                 return await cursor.fetchall()
 
@@ -80,29 +81,29 @@ class EvmContractDateScannerRepository(BaseRepository):
               AND claim_end_getter_abi IS NOT NULL
         """
         async with (await self.pool).acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+            async with conn.cursor(DictCursor) as cursor:
                 await cursor.execute(sql)
                 return await cursor.fetchall()
 
-    async def deactivate_contract_batch(self, conn: aiomysql.Connection, contract_ids: List[int]):
+    async def deactivate_contract_batch(self, conn: asyncmy.Connection, contract_ids: List[int]):
         if not contract_ids: return
         format_strings = ','.join(['%s']*len(contract_ids))
         sql = f"UPDATE evm_airdrop_eligibility_contract SET active_status = 0 WHERE id IN ({format_strings})"
         params = (*contract_ids,)
         async with conn.cursor() as cursor: await cursor.execute(sql, params)
             
-    async def update_claim_start_timestamp(self, conn: aiomysql.Connection, contract_id: int, timestamp: int):
+    async def update_claim_start_timestamp(self, conn: asyncmy.Connection, contract_id: int, timestamp: int):
         sql = "UPDATE evm_airdrop_eligibility_contract SET claim_start_timestamp = FROM_UNIXTIME(%s) WHERE id = %s"
         async with conn.cursor() as cursor: await cursor.execute(sql, (timestamp, contract_id))
 
-    async def invalidate_claim_start_abi(self, conn: aiomysql.Connection, contract_id: int):
+    async def invalidate_claim_start_abi(self, conn: asyncmy.Connection, contract_id: int):
         sql = "UPDATE evm_airdrop_eligibility_contract SET claim_start_getter_abi = NULL WHERE id = %s"
         async with conn.cursor() as cursor: await cursor.execute(sql, (contract_id,))
 
-    async def update_claim_end_timestamp(self, conn: aiomysql.Connection, contract_id: int, timestamp: int, active_status: int):
+    async def update_claim_end_timestamp(self, conn: asyncmy.Connection, contract_id: int, timestamp: int, active_status: int):
         sql = "UPDATE evm_airdrop_eligibility_contract SET claim_end_timestamp = FROM_UNIXTIME(%s), active_status = %s WHERE id = %s"
         async with conn.cursor() as cursor: await cursor.execute(sql, (timestamp, active_status, contract_id))
 
-    async def invalidate_claim_end_abi(self, conn: aiomysql.Connection, contract_id: int):
+    async def invalidate_claim_end_abi(self, conn: asyncmy.Connection, contract_id: int):
         sql = "UPDATE evm_airdrop_eligibility_contract SET claim_end_getter_abi = NULL WHERE id = %s"
         async with conn.cursor() as cursor: await cursor.execute(sql, (contract_id,))
\ No newline at end of file
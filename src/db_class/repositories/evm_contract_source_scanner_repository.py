@@ -1,18 +1,66 @@
+import asyncio
 import logging
-import json
 import time
-from typing import List, Dict, Any, Optional
-import aiomysql
+import itertools
+from typing import List, Dict, Any, Optional, Union
+import asyncmy
+from asyncmy.cursors import DictCursor
+import orjson
 from ..base_repository import BaseRepository
 
 logger = logging.getLogger(__name__)
 
+# token_security_report собирается на стороне MySQL (колонка JSON): 
+# пустой массив, если провайдер метаданных (первый параметр) не задан, иначе массив из одного отчета
+_TOKEN_SECURITY_REPORT_SQL = (
+    "IF(%s IS NULL, JSON_ARRAY(), JSON_ARRAY(JSON_OBJECT("
+    "'security_score', %s, 'possible_spam', (%s IS TRUE), "
+    "'verified_contract', (%s IS TRUE), 'provider', %s)))"
+)
+# Плейсхолдер одной строки VALUES для evm_airdrop_eligibility_contract
+_AIRDROP_CONTRACT_ROW_PLACEHOLDER = (
+    "(%s, %s, %s, %s, %s, %s, %s, FROM_UNIXTIME(%s), FROM_UNIXTIME(%s), %s, %s, %s, %s, %s, "
+    f"{_TOKEN_SECURITY_REPORT_SQL}, %s)"
+)
+_AIRDROP_CONTRACT_ROW_SOURCE_ID_INDEX = 1
+
+# JSON больше этого размера (в символах) проверяется в пуле потоков,
+# чтобы не блокировать event loop. Для маленьких отчетов передача в поток дороже самой проверки.
+_JSON_OFFLOAD_THRESHOLD = 16 * 1024
+
+def _is_valid_json(value: str) -> bool:
+    try:
+        orjson.loads(value)
+        return True
+    except orjson.JSONDecodeError:
+        return False
+
+def _parse_llm_str_field(value: str) -> tuple:
+    stripped = value.strip()
+    # Число (timestamp): проверяем без исключений
+    digits = stripped[1:] if stripped[:1] == '-' else stripped
+    if digits.isdecimal():
+        return (None, int(stripped))
+    # Разбираем только то, что похоже на JSON-объект/массив
+    if stripped[:1] in ('{', '[') and stripped[-1:] in ('}', ']'):
+        return (value, None) if _is_valid_json(stripped) else (None, None)
+    return (None, None)
+
+# Разбор полей LLM по точному типу значения (без try/except в горячем пути)
+_LLM_FIELD_DISPATCH = {
+    type(None): lambda v: (None, None),
+    int: lambda v: (None, v),
+    float: lambda v: (None, int(v)),
+    dict: lambda v: (orjson.dumps(v).decode(), None),
+    list: lambda v: (orjson.dumps(v).decode(), None),
+}
+
 class EvmContractSourceScannerRepository(BaseRepository):
     """
     Репозиторий для EvmContractSourceScanner.
     """
 
-    async def lock_and_get_unprocessed_sources(self, conn: aiomysql.Connection, batch_size: int) -> List[Dict[str, Any]]:
+    async def lock_and_get_unprocessed_sources(self, conn: asyncmy.Connection, batch_size: int) -> List[Dict[str, Any]]:
         sql = """
             SELECT cs.id, cs.evm_network_chain_id, cs.contract_address, 
                    cs.contract_name, cs.source_code, cs.abi
@@ -20,12 +68,12 @@ class EvmContractSourceScannerRepository(BaseRepository):
             WHERE cs.processing_status = 0 AND cs.security_analysis_status = 0
             LIMIT %s FOR UPDATE SKIP LOCKED
         """
-        async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with conn.cursor(DictCursor) as cursor:
             await cursor.execute(sql, (batch_size,))
             return await cursor.fetchall()
 
 
-    async def batch_update_source_processing_status(self, conn: aiomysql.Connection, source_ids: List[int], status: int):
+    async def batch_update_source_processing_status(self, conn: asyncmy.Connection, source_ids: List[int], status: int):
         if not source_ids: return
 
         format_strings = ','.join(['%s'] * len(source_ids))
@@ -36,10 +84,16 @@ class EvmContractSourceScannerRepository(BaseRepository):
         async with conn.cursor() as cursor:
             await cursor.execute(sql, params)
 
-    async def save_slither_report(self, conn: aiomysql.Connection, 
+    async def save_slither_report(self, conn: asyncmy.Connection, 
                                   source_id: int, 
                                   security_status: int, 
-                                  report_json: str):
+                                  report_json: Union[str, bytes]):
+        """
+        Сохраняет статус и отчет Slither.
+
+        :param report_json: bytes - отчет, уже сериализованный orjson (записывается без проверки);
+                            str - внешняя строка, которая сначала проверяется на валидный JSON.
+        """
         sql = """
             UPDATE evm_contract_source 
             SET security_analysis_status = %s, 
@@ -47,38 +101,45 @@ class EvmContractSourceScannerRepository(BaseRepository):
             WHERE id = %s
         """
         try:
-            json.loads(report_json)
-            async with conn.cursor() as cursor:
-                await cursor.execute(sql, (security_status, report_json, source_id))
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON format for Slither report (source_id={source_id}). Skipping report update.")
-            sql_no_report = "UPDATE evm_contract_source SET security_analysis_status = %s WHERE id = %s"
-            async with conn.cursor() as cursor:
-                await cursor.execute(sql_no_report, (security_status, source_id))
+            if isinstance(report_json, bytes):
+                report_ok = True
+            elif len(report_json) > _JSON_OFFLOAD_THRESHOLD:
+                report_ok = await asyncio.to_thread(_is_valid_json, report_json)
+            else:
+                report_ok = _is_valid_json(report_json)
+
+            if report_ok:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql, (security_status, report_json, source_id))
+            else:
+                logger.error(f"Invalid JSON format for Slither report (source_id={source_id}). Skipping report update.")
+                sql_no_report = "UPDATE evm_contract_source SET security_analysis_status = %s WHERE id = %s"
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql_no_report, (security_status, source_id))
         except Exception as e:
             logger.error(f"Failed to save slither report for source_id={source_id}: {e}", exc_info=True)
             raise
 
     def _parse_llm_time_field(self, value: Any) -> tuple:
-        if value is None: return (None, None)
-        if isinstance(value, (int, float)): return (None, int(value))
-        if isinstance(value, (dict, list)):
-            try: return (json.dumps(value), None)
-            except TypeError: return (None, None)
+        """
+        Разбирает поле LLM, которое может быть ABI (объект/JSON-строка) или timestamp.
+        
+        :return: (abi_json | None, timestamp | None)
+        """
+        handler = _LLM_FIELD_DISPATCH.get(type(value))
+        if handler is not None:
+            return handler(value)
         if isinstance(value, str):
-            try: return (None, int(value))
-            except ValueError:
-                try: json.loads(value); return (value, None)
-                except json.JSONDecodeError: return (None, None)
+            return _parse_llm_str_field(value)
         return (None, None)
 
-    async def save_airdrop_contract(self, conn: aiomysql.Connection, 
-                                    source_data: Dict[str, Any], 
-                                    llm_result: Dict[str, Any],
-                                    token_metadata: Optional[Dict[str, Any]]):
+    def build_airdrop_contract_row(self,
+                                   source_data: Dict[str, Any],
+                                   llm_result: Dict[str, Any],
+                                   token_metadata: Optional[Dict[str, Any]]) -> tuple:
         """
-        Атомарно сохраняет финальный результат в 'evm_airdrop_eligibility_contract'
-        и помечает 'evm_contract_source' как завершенный.
+        Готовит строку параметров для вставки в 'evm_airdrop_eligibility_contract'.
+        Порядок значений соответствует _AIRDROP_CONTRACT_ROW_PLACEHOLDER.
         """
         
         # 1. Подготовка данных для вставки
@@ -87,7 +148,7 @@ class EvmContractSourceScannerRepository(BaseRepository):
         contract_address = source_data['contract_address']
         contract_name = source_data.get('contract_name') 
 
-        eligibility_abi = json.dumps(llm_result['eligibility_function_abi'])
+        eligibility_abi = orjson.dumps(llm_result['eligibility_function_abi']).decode()
         (start_abi, start_ts) = self._parse_llm_time_field(llm_result.get('claim_start_getter_abi'))
         (end_abi, end_ts) = self._parse_llm_time_field(llm_result.get('claim_end_getter_abi'))
         (get_token_abi, _) = self._parse_llm_time_field(llm_result.get('get_token_function_abi'))
@@ -98,7 +159,11 @@ class EvmContractSourceScannerRepository(BaseRepository):
 
         token_analysis_status = 0
         active_status = 1
-        security_reports_list = []
+        # Поля отчета о метаданных токена (JSON собирается в SQL)
+        provider_name = None
+        security_score = None
+        possible_spam = None
+        verified_contract = None
         
         # 2. Добавляем отчет о метаданных токена
         if token_metadata:
@@ -110,39 +175,19 @@ class EvmContractSourceScannerRepository(BaseRepository):
                 except (ValueError, TypeError): token_decimals = 18
 
             provider_name = "TokenMetadataProvider(Moralis)"
-            
-            metadata_report = {
-                "security_score": token_metadata.get('security_score'), 
-                "possible_spam": token_metadata.get('possible_spam', False), 
-                "verified_contract": token_metadata.get('verified_contract', False), 
-                "provider": provider_name
-            }
-            security_reports_list.append(metadata_report)
-
-            if metadata_report["possible_spam"] is True:
+            security_score = token_metadata.get('security_score')
+            possible_spam = token_metadata.get('possible_spam', False)
+            verified_contract = token_metadata.get('verified_contract', False)
+
+            if possible_spam is True:
                 active_status = 0 
                 token_analysis_status = 3 # 3 = unsafe
                 logger.warning(f"Contract source_id={source_id} marked as inactive due to possible_spam=true from metadata provider.")
         
-        # Конвертируем массив (который содержит 0 или 1 элемент) в JSON
-        token_security_report_json = json.dumps(security_reports_list)
-
         if active_status == 1 and end_ts and end_ts < int(time.time()):
             active_status = 0
 
-        # Вставляем в evm_airdrop_eligibility_contract
-        sql_insert = f"""
-            INSERT INTO evm_airdrop_eligibility_contract
-            (evm_network_chain_id, evm_contract_source_id, contract_address, 
-             eligibility_function_abi, get_token_function_abi, 
-             claim_start_getter_abi, claim_end_getter_abi,
-             claim_start_timestamp, claim_end_timestamp, contract_name, 
-             token_address, token_ticker, token_decimals, 
-             token_analysis_status, token_security_report, 
-             active_status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, FROM_UNIXTIME(%s), FROM_UNIXTIME(%s), %s, %s, %s, %s, %s, %s, %s)
-        """
-        params = (
+        return (
             chain_id, source_id, contract_address,
             eligibility_abi, get_token_abi, 
             start_abi, end_abi,
@@ -153,17 +198,56 @@ class EvmContractSourceScannerRepository(BaseRepository):
             token_ticker, 
             token_decimals, 
             token_analysis_status, 
-            token_security_report_json,
+            # _TOKEN_SECURITY_REPORT_SQL
+            provider_name, security_score, possible_spam, verified_contract, provider_name,
             active_status
         )
 
+    async def save_airdrop_contracts(self, conn: asyncmy.Connection, rows: List[tuple]):
+        """
+        Сохраняет пачку результатов в 'evm_airdrop_eligibility_contract' одним
+        multi-row INSERT и помечает соответствующие 'evm_contract_source' 
+        как завершенные одним UPDATE (в той же транзакции).
+        
+        :param rows: Строки, подготовленные build_airdrop_contract_row.
+        """
+        if not rows:
+            return
+
+        placeholders = ",".join([_AIRDROP_CONTRACT_ROW_PLACEHOLDER] * len(rows))
+        sql_insert = f"""
+            INSERT INTO evm_airdrop_eligibility_contract
+            (evm_network_chain_id, evm_contract_source_id, contract_address, 
+             eligibility_function_abi, get_token_function_abi, 
+             claim_start_getter_abi, claim_end_getter_abi,
+             claim_start_timestamp, claim_end_timestamp, contract_name, 
+             token_address, token_ticker, token_decimals, 
+             token_analysis_status, token_security_report, 
+             active_status)
+            VALUES {placeholders}
+        """
+        params = tuple(itertools.chain.from_iterable(rows))
+        source_ids = [row[_AIRDROP_CONTRACT_ROW_SOURCE_ID_INDEX] for row in rows]
+
         async with conn.cursor() as cursor:
             try:
                 await cursor.execute(sql_insert, params)
             except Exception as insert_err:
-                 logger.error(f"Failed to insert into evm_airdrop_eligibility_contract for source_id={source_id}: {insert_err}")
+                 logger.error(f"Failed to insert into evm_airdrop_eligibility_contract for source_ids={source_ids}: {insert_err}")
                  raise insert_err
             
-            # 3. Помечаем исходник (evm_contract_source) как завершенный
-            sql_update = "UPDATE evm_contract_source SET processing_status = 2 WHERE id = %s"
-            await cursor.execute(sql_update, (source_id,))
\ No newline at end of file
+            # Помечаем исходники (evm_contract_source) как завершенные
+            format_strings = ','.join(['%s'] * len(source_ids))
+            sql_update = f"UPDATE evm_contract_source SET processing_status = 2 WHERE id IN ({format_strings})"
+            await cursor.execute(sql_update, source_ids)
+
+    async def save_airdrop_contract(self, conn: asyncmy.Connection, 
+                                    source_data: Dict[str, Any], 
+                                    llm_result: Dict[str, Any],
+                                    token_metadata: Optional[Dict[str, Any]]):
+        """
+        Атомарно сохраняет финальный результат в 'evm_airdrop_eligibility_contract'
+        и помечает 'evm_contract_source' как завершенный.
+        """
+        row = self.build_airdrop_contract_row(source_data, llm_result, token_metadata)
+        await self.save_airdrop_contracts(conn, [row])
@@ -1,6 +1,7 @@
 import logging
 from typing import List, Dict, Any, Tuple
-import aiomysql
+import asyncmy
+from asyncmy.cursors import DictCursor
 from ..base_repository import BaseRepository
 
 logger = logging.getLogger(__name__)
@@ -17,16 +18,16 @@ class EvmScannerRepository(BaseRepository):
             WHERE active_status = 1 AND processing_status = 0
         """
         async with (await self.pool).acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+            async with conn.cursor(DictCursor) as cursor:
                 await cursor.execute(sql)
                 return await cursor.fetchall()
 
-    async def start_network_processing(self, conn: aiomysql.Connection, chain_id: int):
+    async def start_network_processing(self, conn: asyncmy.Connection, chain_id: int):
         sql = "UPDATE evm_network SET processing_status = 1 WHERE chain_id = %s"
         async with conn.cursor() as cursor:
             await cursor.execute(sql, (chain_id,))
 
-    async def finish_network_processing(self, conn: aiomysql.Connection, chain_id: int):
+    async def finish_network_processing(self, conn: asyncmy.Connection, chain_id: int):
         """
         Помечает сеть как "обработка завершена" (processing_status = 0).
         НЕ обновляет номер блока (это делается в update_network_last_block).
@@ -40,7 +41,7 @@ class EvmScannerRepository(BaseRepository):
         async with conn.cursor() as cursor:
             await cursor.execute(sql, (chain_id,))
 
-    async def update_network_last_block(self, conn: aiomysql.Connection, chain_id: int, last_block_number: int):
+    async def update_network_last_block(self, conn: asyncmy.Connection, chain_id: int, last_block_number: int):
         """
         Обновляет номер последнего обработанного блока и время.
         Вызывается АТОМАРНО вместе с batch_insert_blocks.
@@ -55,7 +56,7 @@ class EvmScannerRepository(BaseRepository):
             await cursor.execute(sql, (last_block_number, chain_id))
     # ---
 
-    async def batch_insert_blocks(self, conn: aiomysql.Connection, blocks_data: List[Tuple[int, int, str]]):
+    async def batch_insert_blocks(self, conn: asyncmy.Connection, blocks_data: List[Tuple[int, int, str]]):
         if not blocks_data:
             return
             
@@ -2,7 +2,8 @@ import logging
 import json
 import time
 from typing import List, Dict, Any, Optional
-import aiomysql
+import asyncmy
+from asyncmy.cursors import DictCursor
 from ..base_repository import BaseRepository
 
 logger = logging.getLogger(__name__)
@@ -12,18 +13,18 @@ class EvmTokenScannerRepository(BaseRepository):
     Репозиторий для EvmTokenScanner.
     """
 
-    async def get_unverified_tokens_data(self, conn: aiomysql.Connection, batch_size: int) -> List[Dict[str, Any]]:
+    async def get_unverified_tokens_data(self, conn: asyncmy.Connection, batch_size: int) -> List[Dict[str, Any]]:
         sql = """
             SELECT id, token_address, evm_network_chain_id, token_security_report
             FROM evm_airdrop_eligibility_contract
             WHERE active_status = 1 AND token_analysis_status = 0 AND token_address IS NOT NULL
             LIMIT %s FOR UPDATE SKIP LOCKED
         """
-        async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with conn.cursor(DictCursor) as cursor:
             await cursor.execute(sql, (batch_size,))
             return await cursor.fetchall()
 
-    async def update_token_analysis_status(self, conn: aiomysql.Connection, id: int, security_status: int, token_security_report: str):
+    async def update_token_analysis_status(self, conn: asyncmy.Connection, id: int, security_status: int, token_security_report: str):
         active_status = 1
 
         if security_status in [1, 2, 3]:
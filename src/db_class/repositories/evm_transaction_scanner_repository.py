@@ -1,6 +1,7 @@
 import logging
 from typing import List, Dict, Any
-import aiomysql
+import asyncmy
+from asyncmy.cursors import DictCursor
 from ..base_repository import BaseRepository
 
 logger = logging.getLogger(__name__)
@@ -12,7 +13,7 @@ class EvmTransactionScannerRepository(BaseRepository):
     и записью в evm_contract и evm_contract_source.
     """
 
-    async def lock_and_get_unprocessed_txs(self, conn: aiomysql.Connection, batch_size: int) -> List[Dict[str, Any]]:
+    async def lock_and_get_unprocessed_txs(self, conn: asyncmy.Connection, batch_size: int) -> List[Dict[str, Any]]:
         """
         Выбирает и атомарно блокирует (SELECT ... FOR UPDATE) 
         пачку необработанных транзакций создания контрактов.
@@ -25,11 +26,11 @@ class EvmTransactionScannerRepository(BaseRepository):
             FOR UPDATE SKIP LOCKED
         """
 
-        async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with conn.cursor(DictCursor) as cursor:
             await cursor.execute(sql, (batch_size,))
             return await cursor.fetchall()
 
-    async def batch_update_tx_status(self, conn: aiomysql.Connection, tx_ids: List[int], status: int):
+    async def batch_update_tx_status(self, conn: asyncmy.Connection, tx_ids: List[int], status: int):
         """
         Массово обновляет 'processing_status' для списка ID транзакций.
         """
@@ -44,7 +45,7 @@ class EvmTransactionScannerRepository(BaseRepository):
         async with conn.cursor() as cursor:
             await cursor.execute(sql, params)
 
-    async def save_contract_and_source(self, conn: aiomysql.Connection, 
+    async def save_contract_and_source(self, conn: asyncmy.Connection, 
                                        tx_id: int, 
                                        chain_id: int, 
                                        contract_address: str, 
@@ -88,7 +89,7 @@ class EvmTransactionScannerRepository(BaseRepository):
             """
             await cursor.execute(tx_sql, (tx_id,))
 
-    async def save_unverified_contract(self, conn: aiomysql.Connection, tx_id: int, chain_id: int, contract_address: str):
+    async def save_unverified_contract(self, conn: asyncmy.Connection, tx_id: int, chain_id: int, contract_address: str):
         """
         Атомарно сохраняет не верифицированный контракт.
         (Этот метод не трогаем, т.к. он не пишет в evm_contract_source)
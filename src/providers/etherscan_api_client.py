@@ -1,12 +1,25 @@
 import asyncio
+import contextlib
 import logging
 import httpx
-import json
-from typing import Dict, Any, Optional
+import orjson
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Mapping
 from .api_client_interface import AbstractAPIClient 
+from .rate_limiter import AsyncTokenBucket
 
 logger = logging.getLogger(__name__)
 
+# --- Неизменяемые шаблоны параметров запросов ---
+# Собираются один раз при загрузке модуля; в методах к ним добавляются 
+# только изменяемые поля (chainid, apikey и т.д.)
+_BLOCK_NUMBER_PARAMS = MappingProxyType({"module": "proxy", "action": "eth_blockNumber"})
+_BLOCK_BY_NUMBER_PARAMS = MappingProxyType({"module": "proxy", "action": "eth_getBlockByNumber", "boolean": "true"})
+_TRANSACTION_RECEIPT_PARAMS = MappingProxyType({"module": "proxy", "action": "eth_getTransactionReceipt"})
+_CONTRACT_SOURCE_PARAMS = MappingProxyType({"module": "contract", "action": "getsourcecode"})
+_ETH_CALL_PARAMS = MappingProxyType({"module": "proxy", "action": "eth_call", "tag": "latest"})
+_ETH_GET_CODE_PARAMS = MappingProxyType({"module": "proxy", "action": "eth_getCode", "tag": "latest"})
+
 class EtherscanAPIError(Exception):
     """Кастомное исключение для всех ошибок API Etherscan."""
     pass
@@ -19,104 +32,79 @@ class EtherscanAPIClient(AbstractAPIClient):
                  base_url: str, 
                  api_key: str, 
                  delay_seconds: float = 1.0, 
-                 lock: asyncio.Lock = asyncio.Lock(),
+                 rate_limiter: Optional[AsyncTokenBucket] = None,
+                 semaphore: Optional[asyncio.Semaphore] = None,
                  timeout: int = 15,
-                 proxy_url: Optional[str] = None):
+                 proxy_url: Optional[str] = None,
+                 client: Optional[httpx.AsyncClient] = None):
         
         self._base_url = base_url
         self._api_key = api_key
-        self._delay = delay_seconds # Эта задержка не используется напрямую, но нужна для _lock
+        self._delay = delay_seconds # Используется, только если rate_limiter не передан
         self._timeout = timeout
 
+        # Общий httpx-клиент (пул соединений) или собственный, если не передан
         proxy = proxy_url or None
-        self._client = httpx.AsyncClient(timeout=timeout, proxy=proxy)
-        self._last_request_time = 0
-        self._lock = lock # Общая блокировка
+        self._client = client or httpx.AsyncClient(timeout=timeout, proxy=proxy)
+        # Общий (или собственный) лимитер запросов
+        self._rate_limiter = rate_limiter or AsyncTokenBucket(delay_seconds)
+        # Ограничение числа одновременных запросов к хосту (общий семафор на хост)
+        self._semaphore = semaphore or contextlib.nullcontext()
 
-    async def _request(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    async def _request(self, params: Mapping[str, Any]) -> Dict[str, Any]:
         """
         Приватный метод для выполнения запросов с учетом rate-лимита.
+        params не изменяется (apikey добавляется в вызывающих методах).
         """
-        async with self._lock:
-            # Расчет задержки (используем self._delay из config)
-            now = asyncio.get_event_loop().time()
-            time_since_last = now - self._last_request_time
-            sleep_duration = 0
-            
-            if time_since_last < self._delay: 
-                sleep_duration = self._delay - time_since_last
-                await asyncio.sleep(sleep_duration)
-            
-            self._last_request_time = now + sleep_duration
+        # Ждем токен; сам HTTP-запрос ограничен только семафором хоста
+        await self._rate_limiter.acquire()
+
+        try:
+            async with self._semaphore:
+                response = await self._client.get(self._base_url, params=params, timeout=self._timeout)
+            response.raise_for_status() 
+            data = orjson.loads(response.content)
             
-            params['apikey'] = self._api_key
-        
-            try:
-                response = await self._client.get(self._base_url, params=params)
-                response.raise_for_status() 
-                data = response.json()
-                
-                if 'status' in data and data['status'] == '0':
-                    error_message = f"Etherscan API Error: {data.get('message')} - {data.get('result')}"
-                    logger.warning(error_message)
-                    raise EtherscanAPIError(error_message)
-                     
-                if 'result' not in data:
-                     error_message = f"Invalid API response: 'result' not in data. Response: {data}"
-                     logger.error(error_message)
-                     raise EtherscanAPIError(error_message)
-                     
-                return data
+            if 'status' in data and data['status'] == '0':
+                error_message = f"Etherscan API Error: {data.get('message')} - {data.get('result')}"
+                logger.warning(error_message)
+                raise EtherscanAPIError(error_message)
+                 
+            if 'result' not in data:
+                 error_message = f"Invalid API response: 'result' not in data. Response: {data}"
+                 logger.error(error_message)
+                 raise EtherscanAPIError(error_message)
+                 
+            return data
 
-            except httpx.HTTPStatusError as e:
-                logger.error(f"HTTP error for {e.request.url}: {e.response.status_code} - {e.response.text}")
-                raise EtherscanAPIError(f"HTTP error: {e.response.status_code}") from e
-            except httpx.RequestError as e:
-                logger.error(f"Network error for {e.request.url}: {e}")
-                raise EtherscanAPIError(f"Network error: {e}") from e
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to decode JSON response: {e}")
-                raise EtherscanAPIError(f"JSON decode error: {e}") from e
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error for {e.request.url}: {e.response.status_code} - {e.response.text}")
+            raise EtherscanAPIError(f"HTTP error: {e.response.status_code}") from e
+        except httpx.RequestError as e:
+            logger.error(f"Network error for {e.request.url}: {e}")
+            raise EtherscanAPIError(f"Network error: {e}") from e
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Failed to decode JSON response: {e}")
+            raise EtherscanAPIError(f"JSON decode error: {e}") from e
 
 
     async def get_latest_block_number(self, chain_id: int) -> int:
-        params = {
-            "chainid": chain_id,
-            "module": "proxy",
-            "action": "eth_blockNumber"
-        }
+        params = {**_BLOCK_NUMBER_PARAMS, "chainid": chain_id, "apikey": self._api_key}
         data = await self._request(params)
         return int(data['result'], 16)
 
     async def get_block_by_number(self, chain_id: int, block_number: int) -> Optional[Dict[str, Any]]:
-        params = {
-            "chainid": chain_id,
-            "module": "proxy",
-            "action": "eth_getBlockByNumber",
-            "tag": hex(block_number),
-            "boolean": "true"
-        }
+        params = {**_BLOCK_BY_NUMBER_PARAMS, "chainid": chain_id, "tag": hex(block_number), "apikey": self._api_key}
         data = await self._request(params)
         return data.get('result')
     
     async def get_transaction_receipt(self, chain_id: int, tx_hash: str) -> Optional[Dict[str, Any]]:
-        params = {
-            "chainid": chain_id,
-            "module": "proxy",
-            "action": "eth_getTransactionReceipt",
-            "txhash": tx_hash
-        }
+        params = {**_TRANSACTION_RECEIPT_PARAMS, "chainid": chain_id, "txhash": tx_hash, "apikey": self._api_key}
         data = await self._request(params)
         return data.get('result')
 
     async def get_contract_source(self, chain_id: int, contract_address: str) -> Optional[Dict[str, Any]]:
-        params = {
-            "chainid": chain_id,
-            "module": "contract",
-            "action": "getsourcecode",
-            #"contractaddress": contract_address
-            "address": contract_address
-        }
+        params = {**_CONTRACT_SOURCE_PARAMS, "chainid": chain_id, "address": contract_address, "apikey": self._api_key}
         data = await self._request(params)
         result_list = data.get('result')
         if isinstance(result_list, list) and len(result_list) > 0:
@@ -129,14 +117,8 @@ class EtherscanAPIClient(AbstractAPIClient):
         """
         Выполняет eth_call.
         """
-        params = {
-            "chainid": chain_id,
-            "module": "proxy",
-            "action": "eth_call",
-            "to": to_address,
-            "data": data,
-            "tag": "latest" # Обычно читаем из последнего блока
-        }
+        # Читаем из последнего блока (tag=latest в шаблоне)
+        params = {**_ETH_CALL_PARAMS, "chainid": chain_id, "to": to_address, "data": data, "apikey": self._api_key}
         try:
             # Используем _request для rate-лимита и обработки ошибок
             response_data = await self._request(params) 
@@ -155,13 +137,7 @@ class EtherscanAPIClient(AbstractAPIClient):
         """
         Получает код, хранящийся по указанному адресу.
         """
-        params = {
-            "chainid": chain_id,
-            "module": "proxy",
-            "action": "eth_getCode",
-            "address": address,
-            "tag": "latest"
-        }
+        params = {**_ETH_GET_CODE_PARAMS, "chainid": chain_id, "address": address, "apikey": self._api_key}
         try:
             response_data = await self._request(params)
             result = response_data.get('result')
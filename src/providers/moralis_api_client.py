@@ -1,10 +1,13 @@
 import asyncio
+import contextlib
+import functools
 import logging
 import httpx
-import json
-from typing import Dict, Any, Optional
+import orjson
+from typing import Dict, Any, Optional, Tuple
 
 from .api_client_interface import AbstractAPIClient 
+from .rate_limiter import AsyncTokenBucket
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +17,7 @@ class MoralisAPIError(Exception):
     pass
 
 # --- Маппинг ID сетей ---
+@functools.cache
 def _chain_id_to_moralis_format(chain_id: int) -> str:
     """Преобразует числовой chain_id в hex-строку для Moralis."""
     return hex(chain_id)
@@ -26,9 +30,13 @@ class MoralisAPIClient(AbstractAPIClient):
                  base_url: str, 
                  api_key: str, 
                  delay_seconds: float = 0.5,
-                 lock: asyncio.Lock = asyncio.Lock(), 
+                 rate_limiter: Optional[AsyncTokenBucket] = None, 
+                 semaphore: Optional[asyncio.Semaphore] = None,
                  timeout: int = 30,
-                 proxy_url: Optional[str] = None):
+                 proxy_url: Optional[str] = None,
+                 client: Optional[httpx.AsyncClient] = None,
+                 batch_window: float = 0.02,
+                 max_batch_size: int = 25):
         
         if not api_key:
             raise ValueError("Moralis API key is required.")
@@ -42,50 +50,54 @@ class MoralisAPIClient(AbstractAPIClient):
             "X-API-Key": self._api_key
         }
         self._post_headers = {**self._headers, "Content-Type": "application/json"}
+        # Общий httpx-клиент (пул соединений) или собственный, если не передан
         proxy = proxy_url or None
-        self._client = httpx.AsyncClient(timeout=timeout, proxy=proxy)
-        self._last_request_time = 0
-        self._lock = lock 
+        self._client = client or httpx.AsyncClient(timeout=timeout, proxy=proxy)
+        self._rate_limiter = rate_limiter or AsyncTokenBucket(delay_seconds)
+        # Ограничение числа одновременных запросов к хосту (общий семафор на хост)
+        self._semaphore = semaphore or contextlib.nullcontext()
+        # Запросы метаданных, которые сейчас выполняются: (chain_hex, address) -> Task
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        # Микро-батчинг /erc20/metadata: отдельная очередь и воркер на каждую сеть
+        self._batch_window = batch_window
+        self._max_batch_size = max_batch_size
+        self._metadata_queues: Dict[str, asyncio.Queue] = {}
+        self._metadata_workers: Dict[str, asyncio.Task] = {}
 
     async def _request(self, method: str, endpoint: str, 
                        params: Optional[Dict[str, Any]] = None, 
                        json_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         url = f"{self._base_url}{endpoint}"
-        async with self._lock:
-            now = asyncio.get_event_loop().time()
-            time_since_last = now - self._last_request_time
-            sleep_duration = 0
-            if time_since_last < self._delay: 
-                sleep_duration = self._delay - time_since_last
-                await asyncio.sleep(sleep_duration + 0.01) 
-            self._last_request_time = now + sleep_duration
-            try:
+        # Ждем токен; сам HTTP-запрос ограничен только семафором хоста
+        await self._rate_limiter.acquire()
+        try:
+            async with self._semaphore:
                 if method.upper() == 'GET':
-                    response = await self._client.get(url, params=params, headers=self._headers)
+                    response = await self._client.get(url, params=params, headers=self._headers, timeout=self._timeout)
                 elif method.upper() == 'POST':
-                    response = await self._client.post(url, json=json_data, headers=self._post_headers)
+                    response = await self._client.post(url, content=orjson.dumps(json_data), headers=self._post_headers, timeout=self._timeout)
                 else:
                     raise ValueError(f"Unsupported HTTP method: {method}")
-                response.raise_for_status() 
-                if response.status_code == 204: return {} 
-                data = response.json()
-                if isinstance(data, dict) and data.get('message'):
-                    is_likely_error = all(k in ['message', 'name', 'description', 'code'] for k in data.keys())
-                    if is_likely_error:
-                         error_message = f"Moralis API Error: {data.get('message')} (Code: {data.get('code')})"
-                         logger.warning(error_message)
-                         raise MoralisAPIError(error_message)
-                return data
-            except httpx.HTTPStatusError as e:
-                error_body = e.response.text
-                logger.error(f"HTTP error {e.response.status_code} for {e.request.url}: {error_body}")
-                raise MoralisAPIError(f"HTTP error: {e.response.status_code} - {error_body}") from e
-            except httpx.RequestError as e:
-                logger.error(f"Network error for {e.request.url}: {e}")
-                raise MoralisAPIError(f"Network error: {e}") from e
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to decode Moralis JSON response: {e}")
-                raise MoralisAPIError(f"JSON decode error: {e}") from e
+            response.raise_for_status() 
+            if response.status_code == 204: return {} 
+            data = orjson.loads(response.content)
+            if isinstance(data, dict) and data.get('message'):
+                is_likely_error = all(k in ['message', 'name', 'description', 'code'] for k in data.keys())
+                if is_likely_error:
+                     error_message = f"Moralis API Error: {data.get('message')} (Code: {data.get('code')})"
+                     logger.warning(error_message)
+                     raise MoralisAPIError(error_message)
+            return data
+        except httpx.HTTPStatusError as e:
+            error_body = e.response.text
+            logger.error(f"HTTP error {e.response.status_code} for {e.request.url}: {error_body}")
+            raise MoralisAPIError(f"HTTP error: {e.response.status_code} - {error_body}") from e
+        except httpx.RequestError as e:
+            logger.error(f"Network error for {e.request.url}: {e}")
+            raise MoralisAPIError(f"Network error: {e}") from e
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Failed to decode Moralis JSON response: {e}")
+            raise MoralisAPIError(f"JSON decode error: {e}") from e
 
 
     async def get_latest_block_number(self, chain_id: int) -> int:
@@ -125,35 +137,131 @@ class MoralisAPIClient(AbstractAPIClient):
     async def get_token_metadata(self, chain_id: int, token_address: str) -> Optional[Dict[str, Any]]:
         """
         Получает метаданные ERC20 токена, включая symbol, decimals и security info.
+
+        Одновременные запросы для одного и того же (chain_id, token_address)
+        объединяются: HTTP-запрос выполняет первый вызов, остальные ждут его результат.
         """
         chain_hex = _chain_id_to_moralis_format(chain_id)
-        endpoint = f"/erc20/metadata"
-        params = {
-            "chain": chain_hex,   
-            "addresses[0]": token_address
-        }
+        key = (chain_hex, token_address.lower())
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_token_metadata(chain_id, chain_hex, token_address))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield: отмена одного из ожидающих не должна отменять общий запрос
+        return await asyncio.shield(task)
+
+    async def _fetch_token_metadata(self, chain_id: int, chain_hex: str, token_address: str) -> Optional[Dict[str, Any]]:
+        """
+        Ставит адрес в очередь батчера своей сети и ждет ответ Moralis.
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._metadata_queues.get(chain_hex)
+        if queue is None:
+            queue = asyncio.Queue()
+            self._metadata_queues[chain_hex] = queue
+
+        # Батчер запускается лениво и перезапускается, если предыдущий завершился
+        worker = self._metadata_workers.get(chain_hex)
+        if worker is None or worker.done():
+            self._metadata_workers[chain_hex] = asyncio.create_task(self._metadata_batch_worker(chain_id, chain_hex, queue))
+
+        await queue.put((token_address, future))
+
         try:
-            # Moralis возвращает массив, даже если адрес один
-            response_data = await self._request("GET", endpoint, params=params)
-            if isinstance(response_data, list) and len(response_data) > 0:
-                # Берем первый элемент
-                metadata = response_data[0] 
-                
-                # Проверяем наличие нужных полей (symbol/decimals обязательны для успеха)
-                if metadata.get('symbol') and metadata.get('decimals') is not None:
-                    # Добавляем security_score, если он есть (он может отсутствовать)
-                    security_info = metadata.get('verified_contract_security_score') # Имя поля может отличаться
-                    metadata['security_score'] = security_info if security_info else None
-                    return metadata
-                else:
-                    logger.warning(f"Moralis metadata for {token_address} missing symbol or decimals. Response: {metadata}")
-                    return None
-            else:
-                 logger.warning(f"Moralis returned empty or invalid metadata for {token_address}. Response: {response_data}")
-                 return None
-                 
+            metadata = await future
         except MoralisAPIError as e:
             # Ошибки (404, rate limit и т.д.) будут пойманы здесь
             logger.error(f"Failed to get Moralis metadata for token {token_address} on chain {chain_id}: {e}")
             # Выбрасываем исключение, чтобы транзакция откатилась
-            raise
\ No newline at end of file
+            raise
+
+        if metadata is None:
+            logger.warning(f"Moralis returned empty or invalid metadata for {token_address}.")
+            return None
+
+        # Проверяем наличие нужных полей (symbol/decimals обязательны для успеха)
+        if metadata.get('symbol') and metadata.get('decimals') is not None:
+            # Добавляем security_score, если он есть (он может отсутствовать)
+            security_info = metadata.get('verified_contract_security_score') # Имя поля может отличаться
+            metadata['security_score'] = security_info if security_info else None
+            return metadata
+
+        logger.warning(f"Moralis metadata for {token_address} missing symbol or decimals. Response: {metadata}")
+        return None
+
+    @staticmethod
+    def _fail_pending(pending, error: BaseException) -> None:
+        """Завершает ошибкой все еще не выполненные future из пачки/очереди."""
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _metadata_batch_worker(self, chain_id: int, chain_hex: str, queue: asyncio.Queue) -> None:
+        """
+        Собирает адреса, пришедшие в течение batch_window, в один запрос
+        /erc20/metadata (до max_batch_size адресов) и раздает результаты по future.
+        """
+        batch = []
+        try:
+            while True:
+                batch = [await queue.get()]
+                if self._batch_window > 0:
+                    await asyncio.sleep(self._batch_window)
+                while len(batch) < self._max_batch_size and not queue.empty():
+                    batch.append(queue.get_nowait())
+
+                params = {"chain": chain_hex}
+                for i, (address, _) in enumerate(batch):
+                    params[f"addresses[{i}]"] = address
+
+                try:
+                    # Moralis возвращает массив метаданных в порядке адресов запроса
+                    response_data = await self._request("GET", "/erc20/metadata", params=params)
+                except Exception as e:
+                    self._fail_pending(batch, e)
+                    continue
+
+                by_address: Dict[str, Dict[str, Any]] = {}
+                if isinstance(response_data, list):
+                    for item in response_data:
+                        if isinstance(item, dict) and isinstance(item.get('address'), str):
+                            by_address[item['address'].lower()] = item
+                else:
+                    logger.warning(f"Moralis returned invalid metadata batch on chain {chain_id}. Response: {response_data}")
+
+                for address, future in batch:
+                    if not future.done():
+                        future.set_result(by_address.get(address.lower()))
+                batch = []
+        except BaseException as e:
+            # Воркер остановлен (отмена при завершении работы) или упал:
+            # иначе ожидающие get_token_metadata зависли бы навсегда
+            error = MoralisAPIError(f"Moralis metadata batcher for chain {chain_id} stopped: {e!r}")
+            self._fail_pending(batch, error)
+            self._fail_pending(self._drain_queue(queue), error)
+            raise
+
+    @staticmethod
+    def _drain_queue(queue: asyncio.Queue) -> list:
+        items = []
+        while not queue.empty():
+            items.append(queue.get_nowait())
+        return items
+
+    async def aclose(self) -> None:
+        """
+        Останавливает воркеры батчинга метаданных. Ожидающие запросы получают MoralisAPIError.
+        """
+        workers = list(self._metadata_workers.values())
+        self._metadata_workers.clear()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        # Очереди сетей, воркер которых уже завершился, тоже не должны оставлять ожидающих
+        error = MoralisAPIError("Moralis API client closed.")
+        for queue in self._metadata_queues.values():
+            self._fail_pending(self._drain_queue(queue), error)
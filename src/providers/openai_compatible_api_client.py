@@ -1,8 +1,12 @@
 import asyncio
 import logging
 import httpx
-import json
-from typing import Dict, Any, Optional
+import ijson
+import orjson
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from .rate_limiter import AsyncTokenBucket
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +14,26 @@ class OpenAIAPIError(Exception):
     """Кастомное исключение для всех ошибок OpenAI-совместимого API."""
     pass
 
+# Суффикс chat-эндпоинта; остаток base_url считается корнем API (для Files/Batches)
+_CHAT_COMPLETIONS_SUFFIX = "/chat/completions"
+
+# Ответы меньше этого размера разбираются целиком через orjson, больше - потоково
+_STREAM_PARSE_THRESHOLD = 16 * 1024
+
+class _AsyncByteStream:
+    """
+    Адаптер httpx.Response -> асинхронный file-like объект для ijson.
+    """
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+
+    async def read(self, size: int = -1) -> bytes:
+        # ijson вызывает read(0), чтобы определить тип данных (bytes/str)
+        if size == 0:
+            return b''
+        # Остальные чанки отдаем как есть; b'' означает конец потока
+        return await anext(self._chunks, b'')
+
 class OpenAICompatibleClient:
     """
     Клиент для OpenAI-совместимых API (LLM).
@@ -18,24 +42,38 @@ class OpenAICompatibleClient:
                  base_url: str, 
                  api_key: str, 
                  model: str,
-                 lock: asyncio.Lock,
+                 semaphore: asyncio.Semaphore,
                  timeout: int = 180,
-                 proxy_url: Optional[str] = None):
+                 proxy_url: Optional[str] = None,
+                 client: Optional[httpx.AsyncClient] = None,
+                 rate_limiter: Optional[AsyncTokenBucket] = None):
         
         self._base_url = base_url
         self._api_key = api_key
         self._model = model
-        self._lock = lock
+        # Ограничивает число одновременных запросов к модели
+        self._semaphore = semaphore
+        # Ограничивает частоту запросов (RPM провайдера); None - без ограничения
+        self._rate_limiter = rate_limiter
+        self._timeout = timeout
+        # Заголовки передаются в каждом запросе, т.к. httpx-клиент может быть общим
+        self._headers = {
+            "Authorization": f"Bearer {self._api_key}",
+            "Content-Type": "application/json"
+        }
+
+        # Для multipart-загрузки файлов Content-Type выставляет httpx
+        self._auth_headers = {"Authorization": f"Bearer {self._api_key}"}
 
+        # Корень API (https://host/v1) и путь chat-эндпоинта (/v1/chat/completions) для Batch API
+        parts = urlsplit(base_url)
+        self._chat_path = parts.path
+        root_path = parts.path[:-len(_CHAT_COMPLETIONS_SUFFIX)] if parts.path.endswith(_CHAT_COMPLETIONS_SUFFIX) else parts.path
+        self._api_root = urlunsplit((parts.scheme, parts.netloc, root_path.rstrip('/'), '', ''))
+
+        # Общий httpx-клиент (пул соединений) или собственный, если не передан
         proxy = proxy_url or None
-        self._client = httpx.AsyncClient(
-            timeout=timeout,
-            headers={
-                "Authorization": f"Bearer {self._api_key}",
-                "Content-Type": "application/json"
-            },
-            proxy=proxy
-        )
+        self._client = client or httpx.AsyncClient(timeout=timeout, proxy=proxy)
         logger.info(f"OpenAICompatibleClient initialized for model {model} at {base_url}.")
 
     async def query(self, payload: Dict[str, Any]) -> Optional[str]:
@@ -49,18 +87,31 @@ class OpenAICompatibleClient:
         # Добавляем модель в payload
         payload['model'] = self._model
         
-        # Используем общую блокировку (хотя для LLM лимиты обычно выше)
-        async with self._lock:
+        # Не больше N одновременных запросов к модели (N задается семафором)
+        async with self._semaphore:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire()
             try:
-                response = await self._client.post(self._base_url, json=payload)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if not data.get('choices') or not data['choices'][0].get('message'):
-                    raise OpenAIAPIError(f"Invalid LLM response structure: {data}")
-                    
-                content = data['choices'][0]['message'].get('content')
+                async with self._client.stream(
+                    "POST", self._base_url, content=orjson.dumps(payload), headers=self._headers, timeout=self._timeout
+                ) as response:
+                    if response.is_error:
+                        # Для текста ошибки тело нужно дочитать
+                        await response.aread()
+                    response.raise_for_status()
+
+                    content_length = response.headers.get("content-length")
+                    if content_length is not None and int(content_length) < _STREAM_PARSE_THRESHOLD:
+                        # Маленький ответ: потоковый разбор не дает выигрыша
+                        data = orjson.loads(await response.aread())
+
+                        if not data.get('choices') or not data['choices'][0].get('message'):
+                            raise OpenAIAPIError(f"Invalid LLM response structure: {data}")
+
+                        content = data['choices'][0]['message'].get('content')
+                    else:
+                        content = await self._stream_content(response)
+
                 return content.strip() if content else None
 
             except httpx.HTTPStatusError as e:
@@ -70,6 +121,120 @@ class OpenAICompatibleClient:
             except httpx.RequestError as e:
                 logger.error(f"LLM Network error for {e.request.url}: {e}")
                 raise OpenAIAPIError(f"Network error: {e}") from e
-            except json.JSONDecodeError as e:
+            except (orjson.JSONDecodeError, ijson.JSONError) as e:
                 logger.error(f"Failed to decode LLM JSON response: {e}")
-                raise OpenAIAPIError(f"JSON decode error: {e}") from e
\ No newline at end of file
+                raise OpenAIAPIError(f"JSON decode error: {e}") from e
+
+    async def _batch_api_request(self, method: str, path: str,
+                                 json_data: Optional[Dict[str, Any]] = None, **kwargs) -> httpx.Response:
+        """
+        Выполняет служебный запрос к Files/Batches API (вне семафора модели).
+        """
+        url = f"{self._api_root}{path}"
+        if json_data is not None:
+            kwargs['content'] = orjson.dumps(json_data)
+            headers = self._headers
+        else:
+            headers = self._auth_headers
+
+        try:
+            response = await self._client.request(method, url, headers=headers, timeout=self._timeout, **kwargs)
+            response.raise_for_status()
+            return response
+        except httpx.HTTPStatusError as e:
+            error_body = e.response.text
+            logger.error(f"LLM Batch API HTTP error {e.response.status_code} for {path}: {error_body}")
+            raise OpenAIAPIError(f"HTTP error: {e.response.status_code} - {error_body}") from e
+        except httpx.RequestError as e:
+            logger.error(f"LLM Batch API network error for {e.request.url}: {e}")
+            raise OpenAIAPIError(f"Network error: {e}") from e
+
+    async def create_batch(self, requests: List[Dict[str, Any]]) -> str:
+        """
+        Создает batch-задачу (OpenAI Batch API): загружает JSONL-файл и запускает обработку.
+
+        :param requests: Список {"custom_id": str, "payload": dict}, payload - как для query().
+        :return: ID batch-задачи.
+        """
+        jsonl = b"".join(
+            orjson.dumps({
+                "custom_id": request['custom_id'],
+                "method": "POST",
+                "url": self._chat_path,
+                "body": {**request['payload'], 'model': self._model}
+            }) + b"\n"
+            for request in requests
+        )
+
+        try:
+            response = await self._batch_api_request(
+                "POST", "/files",
+                data={"purpose": "batch"},
+                files={"file": ("batch.jsonl", jsonl, "application/jsonl")}
+            )
+            file_id = orjson.loads(response.content)['id']
+
+            response = await self._batch_api_request("POST", "/batches", json_data={
+                "input_file_id": file_id,
+                "endpoint": self._chat_path,
+                "completion_window": "24h"
+            })
+            batch_id = orjson.loads(response.content)['id']
+        except (orjson.JSONDecodeError, KeyError) as e:
+            logger.error(f"Invalid LLM Batch API response: {e}")
+            raise OpenAIAPIError(f"Invalid Batch API response: {e}") from e
+
+        logger.info(f"LLM batch {batch_id} created with {len(requests)} requests.")
+        return batch_id
+
+    async def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        """
+        Возвращает состояние batch-задачи (status, output_file_id, error_file_id и т.д.).
+        """
+        response = await self._batch_api_request("GET", f"/batches/{batch_id}")
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Failed to decode LLM Batch API response: {e}")
+            raise OpenAIAPIError(f"JSON decode error: {e}") from e
+
+    async def get_batch_results(self, file_id: str) -> Dict[str, Optional[str]]:
+        """
+        Скачивает файл результатов (output_file_id) или ошибок (error_file_id) batch-задачи.
+        Строки обоих файлов имеют одинаковый формат.
+
+        :return: Словарь custom_id -> content ответа модели (None, если запрос завершился ошибкой).
+        """
+        response = await self._batch_api_request("GET", f"/files/{file_id}/content")
+
+        results: Dict[str, Optional[str]] = {}
+        for line in response.content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = orjson.loads(line)
+                custom_id = item['custom_id']
+            except (orjson.JSONDecodeError, KeyError) as e:
+                logger.warning(f"Skipping invalid LLM batch result line: {e}")
+                continue
+
+            body = (item.get('response') or {}).get('body') or {}
+            choices = body.get('choices') or []
+            if item.get('error') or not choices or not choices[0].get('message'):
+                logger.warning(f"LLM batch request {custom_id} failed: {item.get('error') or body}")
+                results[custom_id] = None
+                continue
+
+            content = choices[0]['message'].get('content')
+            results[custom_id] = content.strip() if content else None
+        return results
+
+    @staticmethod
+    async def _stream_content(response: httpx.Response) -> Optional[str]:
+        """
+        Разбирает тело ответа по мере загрузки и извлекает только
+        choices[0].message.content; остальной JSON не материализуется.
+        """
+        async for content in ijson.items(_AsyncByteStream(response), 'choices.item.message.content'):
+            return content
+        raise OpenAIAPIError("Invalid LLM response structure: choices[0].message.content not found")
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """
+    Асинхронный rate-лимитер по алгоритму token bucket.
+
+    Токены пополняются со скоростью 1 токен за delay_seconds, но не больше capacity.
+    Блокировка защищает только арифметику над токенами: сам HTTP-запрос
+    выполняется вне критической секции, поэтому несколько запросов
+    могут идти параллельно в пределах лимита провайдера.
+    """
+    def __init__(self, delay_seconds: float, capacity: int = 1):
+        """
+        :param delay_seconds: Интервал пополнения одного токена (секунды). 0 - без ограничений.
+        :param capacity: Максимальное число токенов (допустимый burst запросов).
+        """
+        if capacity < 1:
+            raise ValueError("Token bucket capacity must be at least 1.")
+
+        self._delay = delay_seconds
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Забирает один токен, при необходимости ожидая его пополнения.
+        """
+        if self._delay <= 0:
+            return
+
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._last_refill
+                self._tokens = min(self._capacity, self._tokens + elapsed / self._delay)
+                self._last_refill = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                sleep_duration = (1 - self._tokens) * self._delay
+
+            # Ждем вне блокировки, чтобы не задерживать остальных
+            await asyncio.sleep(sleep_duration)
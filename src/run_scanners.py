@@ -1,6 +1,8 @@
 import asyncio
 import logging
 import signal
+import time
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,7 +19,7 @@ from .contract_indexer.evm_contract_date_scanner import EvmContractDateScanner
 from .contract_indexer.evm_token_scanner import EvmTokenScanner
 
 from .utils.abi_filter import AirdropABIFilter 
-from .utils.slither_analyzer import SlitherAnalyzer 
+from .utils.slither_analyzer import SlitherAnalyzer, SlitherWorkerPool
 from .utils.llm_airdrop_analyzer import LLMAirdropAnalyzer 
 
 # Logging settings
@@ -35,8 +37,27 @@ logger.info(f"Logging level set to {log_level_name} based on APP_ENV='{config.AP
 
 # --- Инициализация Утилит Анализа ---
 abi_filter = AirdropABIFilter(keywords=config.AIRDROP_ABI_KEYWORDS)
-slither_analyzer = SlitherAnalyzer()
-llm_analyzer = LLMAirdropAnalyzer(client=services.analyzer_api_client_llm)
+# Кэш отчетов Slither ограничен суммарным размером (в байтах), а не числом записей
+slither_result_cache = (
+    TTLCache(maxsize=config.SLITHER_RESULT_CACHE_MB * 1024 * 1024, ttl=config.SLITHER_RESULT_CACHE_TTL, getsizeof=len)
+    if config.SLITHER_RESULT_CACHE_MB > 0 else None
+)
+slither_worker_pool = (
+    SlitherWorkerPool(size=config.SLITHER_WORKERS, timeout=config.SLITHER_TIMEOUT, max_jobs=config.SLITHER_WORKER_MAX_JOBS)
+    if config.SLITHER_WORKERS > 0 else None
+)
+slither_analyzer = SlitherAnalyzer(
+    result_cache=slither_result_cache,
+    worker_pool=slither_worker_pool,
+    solc_versions=config.SLITHER_SOLC_VERSIONS,
+    timeout=config.SLITHER_TIMEOUT
+)
+llm_analyzer = LLMAirdropAnalyzer(
+    client=services.analyzer_api_client_llm,
+    prompt_cache_control=config.CONTRACT_ANALYZER_MODEL_PROMPT_CACHE_CONTROL,
+    max_source_chars=config.CONTRACT_ANALYZER_MAX_SOURCE_CHARS,
+    structured_output=config.CONTRACT_ANALYZER_MODEL_STRUCTURED_OUTPUT
+)
 
 # --- Инициализация Сканеров ---
 evm_scanner = EvmScanner(
@@ -82,15 +103,24 @@ token_scanner = EvmTokenScanner(
 async def run_scanner_loop(scanner_name: str, scanner_instance, interval: int):
     """
     Обёртка-цикл (daemon-style) для запуска сканера с заданным интервалом.
+    Интервал отсчитывается от начала прогона; после ошибок пауза растет экспоненциально (до 60 секунд).
     """
     logger.info(f"Starting scanner loop for {scanner_name} with interval {interval}s")
+    attempt = 0
     while True:
+        started_at = time.monotonic()
         try:
             await scanner_instance.run()
+            attempt = 0
+            delay = 0
         except Exception as e:
             logger.error(f"Error in {scanner_name} loop: {e}", exc_info=True)
-        
-        await asyncio.sleep(interval)
+            delay = min(60, 2 ** attempt)
+            attempt += 1
+
+        # Время прогона вычитается из интервала, чтобы долгие прогоны не сдвигали расписание
+        remaining = interval - (time.monotonic() - started_at)
+        await asyncio.sleep(max(0, remaining, delay))
 
 
 async def main():
@@ -104,28 +134,25 @@ async def main():
         await services.db_connector.init_pool() 
         logger.info("Database pool initialized.")
         
-        tasks = [
-            asyncio.create_task(run_scanner_loop(
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(run_scanner_loop(
                 "EvmScanner", evm_scanner, config.EVM_SCANNER_RUN_INTERVAL
-            )),
-            asyncio.create_task(run_scanner_loop(
+            ))
+            tg.create_task(run_scanner_loop(
                 "EvmBlockScanner", block_scanner, config.EVM_BLOCK_SCANNER_RUN_INTERVAL
-            )),
-            asyncio.create_task(run_scanner_loop(
+            ))
+            tg.create_task(run_scanner_loop(
                 "EvmTransactionScanner", tx_scanner, config.EVM_TRANSACTION_SCANNER_RUN_INTERVAL
-            )),
-            asyncio.create_task(run_scanner_loop(
+            ))
+            tg.create_task(run_scanner_loop(
                 "EvmContractSourceScanner", source_scanner, config.EVM_CONTRACT_SOURCE_SCANNER_RUN_INTERVAL
-            )),
-            asyncio.create_task(run_scanner_loop(
+            ))
+            tg.create_task(run_scanner_loop(
                 "EvmContractDateScanner", date_scanner, config.EVM_CONTRACT_DATE_SCANNER_RUN_INTERVAL
-            )),
-            asyncio.create_task(run_scanner_loop(
+            ))
+            tg.create_task(run_scanner_loop(
                 "EvmTokenScanner", token_scanner, config.EVM_TOKEN_SCANNER_RUN_INTERVAL
-            )),
-        ]
-        
-        await asyncio.gather(*tasks)
+            ))
         
     except asyncio.CancelledError:
         logger.info("Main task cancelled. Shutting down...")
@@ -133,6 +160,13 @@ async def main():
         logger.info("Closing database pool...")
         # Используем импортированный коннектор
         await services.db_connector.close_pool()
+        logger.info("Stopping Moralis metadata batchers...")
+        await services.api_client_token_metadata.aclose()
+        logger.info("Closing HTTP clients...")
+        await services.close_http_clients()
+        if slither_worker_pool is not None:
+            logger.info("Stopping Slither workers...")
+            await slither_worker_pool.close()
         logger.info("Shutdown complete.")
 
 
@@ -143,7 +177,9 @@ def handle_shutdown(sig, loop):
         task.cancel()
 
 if __name__ == "__main__":
-    loop = asyncio.get_event_loop()
+    # Явно создаем цикл: get_event_loop() вне работающего цикла устарел (DeprecationWarning в 3.12+)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
 
     for sig in (signal.SIGINT, signal.SIGTERM):
         loop.add_signal_handler(sig, handle_shutdown, sig, loop)
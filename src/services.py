@@ -1,9 +1,13 @@
 import asyncio
+import httpx
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
 from . import config
 
 from .providers.etherscan_api_client import EtherscanAPIClient
 from .providers.openai_compatible_api_client import OpenAICompatibleClient
 from .providers.moralis_api_client import MoralisAPIClient
+from .providers.rate_limiter import AsyncTokenBucket
 
 from .db_class.mysql_connector import MySQLConnector
 
@@ -21,32 +25,91 @@ Any other file in the application can import this file
 and access already configured clients or repositories.
 """
 
-# --- API blocks ---
-agent_rate_limit_lock_etherscan = asyncio.Lock()
-analyzer_api_rate_limit_lock_llm = asyncio.Lock()
-api_rate_limit_lock_llm = asyncio.Lock()
-api_rate_limit_lock_moralis = asyncio.Lock()
-
-# --- Scanner locks (depending on mode) ---
+# --- Shared HTTP clients ---
+# One connection pool (keep-alive + HTTP/2) per proxy, reused by all API clients
+# so TCP/TLS sessions to Etherscan/Moralis/LLM hosts are not re-established per client.
+# Timeouts and auth headers are passed per request by each API client.
+_http_clients: Dict[Optional[str], httpx.AsyncClient] = {}
+
+def _shared_http_client(proxy_url: Optional[str]) -> httpx.AsyncClient:
+    proxy = proxy_url or None
+    client = _http_clients.get(proxy)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            http2=True,
+            proxy=proxy
+        )
+        _http_clients[proxy] = client
+    return client
+
+async def close_http_clients():
+    """Closes all shared HTTP connection pools."""
+    for client in _http_clients.values():
+        await client.aclose()
+    _http_clients.clear()
+
+# --- API rate limiters and semaphores ---
+def _evm_rate_limiter() -> AsyncTokenBucket:
+    return AsyncTokenBucket(config.EVM_API_REQUEST_DELAY, capacity=config.EVM_API_REQUEST_BURST)
+
+agent_rate_limiter_etherscan = _evm_rate_limiter()
+# LLM: contract analysis may run several requests in parallel, agent requests stay sequential
+analyzer_api_semaphore_llm = asyncio.Semaphore(config.CONTRACT_ANALYZER_MODEL_MAX_CONCURRENCY)
+api_semaphore_llm = asyncio.Semaphore(1)
+# LLM requests-per-minute cap for contract analysis (0 - unlimited)
+analyzer_rate_limiter_llm = (
+    AsyncTokenBucket(60 / config.CONTRACT_ANALYZER_MODEL_RPM)
+    if config.CONTRACT_ANALYZER_MODEL_RPM > 0 else None
+)
+# Moralis: не чаще одного запроса в 0.5 секунды
+rate_limiter_moralis = AsyncTokenBucket(0.5)
+
+# --- Per-host concurrency limits ---
+# Caps the number of in-flight requests to each API host (rate limiters only pace request starts).
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def _host_semaphore(base_url: Optional[str]) -> asyncio.Semaphore:
+    host = urlsplit(base_url or "").netloc
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(config.EVM_API_HOST_MAX_CONCURRENCY)
+        _host_semaphores[host] = semaphore
+    return semaphore
+
+# --- Scanner rate limiters (depending on mode) ---
 if config.SCANNERS_API_PARALLEL_MODE:
-    # PARALLEL MODE: Each client has its own independent lock.
-    # This will allow 4 scanners to make requests simultaneously.
-    lock_evm_scanner = asyncio.Lock()
-    lock_block_scanner = asyncio.Lock()
-    lock_tx_scanner = asyncio.Lock()
-    lock_date_scanner = asyncio.Lock()
-    lock_get_token = asyncio.Lock()
-    lock_token_scanner = asyncio.Lock()
+    # PARALLEL MODE: Each client has its own independent rate limiter.
+    # This will allow scanners to make requests simultaneously.
+    limiter_evm_scanner = _evm_rate_limiter()
+    limiter_block_scanner = _evm_rate_limiter()
+    limiter_tx_scanner = _evm_rate_limiter()
+    limiter_date_scanner = _evm_rate_limiter()
+    limiter_get_token = _evm_rate_limiter()
+    limiter_token_scanner = _evm_rate_limiter()
 else:
-    # SINGLE MODE (default): All clients share one lock
-    # This will put all requests in a single queue.
-    single_global_lock = asyncio.Lock()
-    lock_evm_scanner = single_global_lock
-    lock_block_scanner = single_global_lock
-    lock_tx_scanner = single_global_lock
-    lock_date_scanner = single_global_lock
-    lock_get_token = single_global_lock
-    lock_token_scanner = single_global_lock
+    # SINGLE MODE (default): Clients that use the same API host and key share one rate limiter.
+    # With the default settings all scanners use EVM_API_URL/EVM_API_KEY and therefore share
+    # a single limiter; scanners configured with a different host or key get their own budget.
+    _shared_limiters: Dict[Tuple[str, Optional[str]], AsyncTokenBucket] = {}
+
+    def _shared_evm_rate_limiter(base_url: Optional[str], api_key: Optional[str]) -> AsyncTokenBucket:
+        key = (urlsplit(base_url or "").netloc, api_key)
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            limiter = _evm_rate_limiter()
+            _shared_limiters[key] = limiter
+        return limiter
+
+    limiter_evm_scanner = _shared_evm_rate_limiter(config.EVM_SCANNER_API_URL, config.EVM_SCANNER_API_KEY)
+    limiter_block_scanner = _shared_evm_rate_limiter(config.EVM_BLOCK_SCANNER_API_URL, config.EVM_BLOCK_SCANNER_API_KEY)
+    limiter_tx_scanner = _shared_evm_rate_limiter(config.EVM_TRANSACTION_SCANNER_API_URL, config.EVM_TRANSACTION_SCANNER_API_KEY)
+    limiter_date_scanner = _shared_evm_rate_limiter(config.EVM_CONTRACT_DATE_SCANNER_API_URL, config.EVM_CONTRACT_DATE_SCANNER_API_KEY)
+    limiter_get_token = _shared_evm_rate_limiter(config.EVM_GET_TOKEN_HASH_API_URL, config.EVM_GET_TOKEN_HASH_API_KEY)
+    limiter_token_scanner = _shared_evm_rate_limiter(config.EVM_TOKEN_SCANNER_API_URL, config.EVM_TOKEN_SCANNER_API_KEY)
 
 db_connector = MySQLConnector(minsize=1, maxsize=10, autocommit=False)
 
@@ -64,8 +127,10 @@ api_client_evm = EtherscanAPIClient(
     api_key=config.EVM_SCANNER_API_KEY,
     delay_seconds=config.EVM_API_REQUEST_DELAY,
     timeout=config.EVM_SCANNER_API_TIMEOUT,
-    lock=lock_evm_scanner,
-    proxy_url=config.EVM_SCANNER_API_PROXY_URL
+    semaphore=_host_semaphore(config.EVM_SCANNER_API_URL),
+    rate_limiter=limiter_evm_scanner,
+    proxy_url=config.EVM_SCANNER_API_PROXY_URL,
+    client=_shared_http_client(config.EVM_SCANNER_API_PROXY_URL)
 )
 
 # --- EvmBlockScanner API client ---
@@ -74,8 +139,10 @@ api_client_block = EtherscanAPIClient(
     api_key=config.EVM_BLOCK_SCANNER_API_KEY,
     delay_seconds=config.EVM_API_REQUEST_DELAY,
     timeout=config.EVM_BLOCK_SCANNER_API_TIMEOUT,
-    lock=lock_block_scanner,
-    proxy_url=config.EVM_BLOCK_SCANNER_API_PROXY_URL
+    semaphore=_host_semaphore(config.EVM_BLOCK_SCANNER_API_URL),
+    rate_limiter=limiter_block_scanner,
+    proxy_url=config.EVM_BLOCK_SCANNER_API_PROXY_URL,
+    client=_shared_http_client(config.EVM_BLOCK_SCANNER_API_PROXY_URL)
 )
 
 # --- EvmTransactionScanner API client ---
@@ -84,8 +151,10 @@ api_client_tx = EtherscanAPIClient(
     api_key=config.EVM_TRANSACTION_SCANNER_API_KEY,
     delay_seconds=config.EVM_API_REQUEST_DELAY,
     timeout=config.EVM_TRANSACTION_SCANNER_API_TIMEOUT,
-    lock=lock_tx_scanner,
-    proxy_url=config.EVM_TRANSACTION_SCANNER_API_PROXY_URL
+    semaphore=_host_semaphore(config.EVM_TRANSACTION_SCANNER_API_URL),
+    rate_limiter=limiter_tx_scanner,
+    proxy_url=config.EVM_TRANSACTION_SCANNER_API_PROXY_URL,
+    client=_shared_http_client(config.EVM_TRANSACTION_SCANNER_API_PROXY_URL)
 )
 
 # --- EvmContractDateScanner API client ---
@@ -94,8 +163,10 @@ api_client_date_scanner = EtherscanAPIClient(
     api_key=config.EVM_CONTRACT_DATE_SCANNER_API_KEY,
     delay_seconds=config.EVM_API_REQUEST_DELAY,
     timeout=config.EVM_CONTRACT_DATE_SCANNER_API_TIMEOUT,
-    lock=lock_date_scanner,
-    proxy_url=config.EVM_CONTRACT_DATE_SCANNER_API_PROXY_URL
+    semaphore=_host_semaphore(config.EVM_CONTRACT_DATE_SCANNER_API_URL),
+    rate_limiter=limiter_date_scanner,
+    proxy_url=config.EVM_CONTRACT_DATE_SCANNER_API_PROXY_URL,
+    client=_shared_http_client(config.EVM_CONTRACT_DATE_SCANNER_API_PROXY_URL)
 )
 
 # --- EvmTokenScanner API client ---
@@ -104,8 +175,10 @@ api_client_token_scanner = EtherscanAPIClient(
     api_key=config.EVM_TOKEN_SCANNER_API_KEY,
     delay_seconds=config.EVM_API_REQUEST_DELAY,
     timeout=config.EVM_TOKEN_SCANNER_API_TIMEOUT,
-    lock=lock_token_scanner,
-    proxy_url=config.EVM_TOKEN_SCANNER_API_PROXY_URL
+    semaphore=_host_semaphore(config.EVM_TOKEN_SCANNER_API_URL),
+    rate_limiter=limiter_token_scanner,
+    proxy_url=config.EVM_TOKEN_SCANNER_API_PROXY_URL,
+    client=_shared_http_client(config.EVM_TOKEN_SCANNER_API_PROXY_URL)
 )
 
 # ---  API client for fetching the token address ---
@@ -114,17 +187,21 @@ api_client_get_token = EtherscanAPIClient(
     api_key=config.EVM_GET_TOKEN_HASH_API_KEY,
     delay_seconds=config.EVM_API_REQUEST_DELAY, 
     timeout=config.EVM_GET_TOKEN_HASH_API_TIMEOUT,
-    lock=lock_get_token,
-    proxy_url=config.EVM_GET_TOKEN_HASH_API_PROXY_URL
+    semaphore=_host_semaphore(config.EVM_GET_TOKEN_HASH_API_URL),
+    rate_limiter=limiter_get_token,
+    proxy_url=config.EVM_GET_TOKEN_HASH_API_PROXY_URL,
+    client=_shared_http_client(config.EVM_GET_TOKEN_HASH_API_PROXY_URL)
 )
 
 # ---  API client for fetching the token metadata ---
 api_client_token_metadata = MoralisAPIClient(
     base_url=config.EVM_GET_TOKEN_METADATA_API_URL,
     api_key=config.EVM_GET_TOKEN_METADATA_API_KEY,
-    lock=api_rate_limit_lock_moralis, 
+    semaphore=_host_semaphore(config.EVM_GET_TOKEN_METADATA_API_URL),
+    rate_limiter=rate_limiter_moralis, 
     timeout=config.EVM_GET_TOKEN_METADATA_API_TIMEOUT,
-    proxy_url=config.EVM_GET_TOKEN_METADATA_API_PROXY_URL
+    proxy_url=config.EVM_GET_TOKEN_METADATA_API_PROXY_URL,
+    client=_shared_http_client(config.EVM_GET_TOKEN_METADATA_API_PROXY_URL)
 )
 
 # --- OpenAI (LLM) API client (for contract analysis) ---
@@ -132,9 +209,11 @@ analyzer_api_client_llm = OpenAICompatibleClient(
     base_url=config.CONTRACT_ANALYZER_MODEL_API_URL,
     api_key=config.CONTRACT_ANALYZER_MODEL_API_KEY,
     model=config.CONTRACT_ANALYZER_MODEL_NAME,
-    lock=analyzer_api_rate_limit_lock_llm,
+    semaphore=analyzer_api_semaphore_llm,
     timeout=config.CONTRACT_ANALYZER_MODEL_TIMEOUT,
-    proxy_url=config.CONTRACT_ANALYZER_MODEL_API_PROXY_URL
+    proxy_url=config.CONTRACT_ANALYZER_MODEL_API_PROXY_URL,
+    client=_shared_http_client(config.CONTRACT_ANALYZER_MODEL_API_PROXY_URL),
+    rate_limiter=analyzer_rate_limiter_llm
 )
 
 # --- OpenAI (LLM) API client (for extracting user prompts) ---
@@ -142,9 +221,10 @@ extractor_client_llm = OpenAICompatibleClient(
     base_url=config.EXTRACTOR_MODEL_API_URL,
     api_key=config.EXTRACTOR_MODEL_API_KEY,
     model=config.EXTRACTOR_MODEL_NAME,
-    lock=api_rate_limit_lock_llm,
+    semaphore=api_semaphore_llm,
     timeout=config.EXTRACTOR_MODEL_API_TIMEOUT,
-    proxy_url=config.EXTRACTOR_MODEL_API_PROXY_URL
+    proxy_url=config.EXTRACTOR_MODEL_API_PROXY_URL,
+    client=_shared_http_client(config.EXTRACTOR_MODEL_API_PROXY_URL)
 )
 
 # --- OpenAI (LLM) API client (for generating final user responses) ---
@@ -152,9 +232,10 @@ response_formatter_client_llm = OpenAICompatibleClient(
     base_url=config.MODEL_API_URL,
     api_key=config.MODEL_API_KEY,
     model=config.MODEL_NAME,
-    lock=api_rate_limit_lock_llm,
+    semaphore=api_semaphore_llm,
     timeout=config.MODEL_API_TIMEOUT,
-    proxy_url=config.MODEL_API_PROXY_URL
+    proxy_url=config.MODEL_API_PROXY_URL,
+    client=_shared_http_client(config.MODEL_API_PROXY_URL)
 )
 
 # --- Agent API (For eth_call contract airdrop eligibility request) ---
@@ -163,6 +244,8 @@ agent_evm_api_client = EtherscanAPIClient(
     api_key=config.EVM_API_KEY,
     delay_seconds=config.EVM_API_REQUEST_DELAY,
     timeout=config.EVM_API_TIMEOUT,
-    lock=agent_rate_limit_lock_etherscan,
-    proxy_url=config.EVM_API_PROXY_URL
+    semaphore=_host_semaphore(config.EVM_API_URL),
+    rate_limiter=agent_rate_limiter_etherscan,
+    proxy_url=config.EVM_API_PROXY_URL,
+    client=_shared_http_client(config.EVM_API_PROXY_URL)
 )
\ No newline at end of file
@@ -1,7 +1,15 @@
 import logging
-import json
+import re
+import orjson
+import ahocorasick
 from typing import List, Dict, Any
 
+try:
+    # Опциональный ускоритель (Intel Hyperscan, SIMD); без него используется Ахо-Корасик
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
 logger = logging.getLogger(__name__)
 
 class AirdropABIFilter:
@@ -15,8 +23,46 @@ class AirdropABIFilter:
         
         :param keywords: Список ключевых слов (в нижнем регистре) для поиска.
         """
-        self._keywords = set(keywords)
-        logger.info(f"AirdropABIFilter initialized with keywords: {keywords}")
+        # Приводим к нижнему регистру один раз, убираем пустые и дубликаты (порядок сохраняется)
+        self._keywords = tuple(dict.fromkeys(keyword.lower() for keyword in keywords if keyword))
+
+        # Автомат Ахо-Корасик для быстрой предварительной проверки всей ABI-строки
+        self._automaton = ahocorasick.Automaton()
+        for keyword in self._keywords:
+            self._automaton.add_word(keyword, keyword)
+        self._automaton.make_automaton()
+
+        # Одно регулярное выражение для подтверждения совпадения в имени элемента ABI
+        self._keywords_regex = re.compile('|'.join(map(re.escape, self._keywords)), re.IGNORECASE) if self._keywords else None
+
+        # Если установлен hyperscan, компилируем все ключевые слова в одну базу (без учета регистра)
+        self._hs_db = None
+        hs_keywords = [re.escape(keyword).encode() for keyword in self._keywords]
+        if hyperscan is not None and hs_keywords:
+            self._hs_db = hyperscan.Database()
+            self._hs_db.compile(
+                expressions=hs_keywords,
+                ids=list(range(len(hs_keywords))),
+                elements=len(hs_keywords),
+                flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(hs_keywords)
+            )
+        logger.info("AirdropABIFilter initialized with keywords: %s", keywords)
+
+    def _contains_keyword(self, abi_str: str) -> bool:
+        """
+        Проверяет, встречается ли хоть одно ключевое слово где-либо в строке.
+        """
+        if self._hs_db is not None:
+            try:
+                # Callback возвращает True - hyperscan останавливает поиск на первом совпадении
+                self._hs_db.scan(abi_str.encode(), match_event_handler=lambda *_: True)
+            except hyperscan.ScanTerminated:
+                return True
+            return False
+
+        if self._keywords_regex is None:
+            return False
+        return next(self._automaton.iter(abi_str.lower()), None) is not None
 
     def check_abi(self, abi_str: str) -> bool:
         """
@@ -27,27 +73,31 @@ class AirdropABIFilter:
         """
         if not abi_str:
             return False
+
+        # Быстрый отказ: если ключевых слов нет во всей строке, JSON не разбираем.
+        # Совпадение здесь еще не означает HIT (слово могло встретиться не в name)
+        if not self._contains_keyword(abi_str):
+            return False
             
         try:
-            abi_data = json.loads(abi_str)
+            abi_data = orjson.loads(abi_str)
             if not isinstance(abi_data, list):
-                logger.warning(f"Invalid ABI format: not a list. ABI: {abi_str[:200]}")
+                logger.warning("Invalid ABI format: not a list. ABI: %s", abi_str[:200])
                 return False
 
             # Проверяем все элементы ABI (функции, события и т.д.)
             for item in abi_data:
                 if isinstance(item, dict) and 'name' in item:
-                    item_name = item['name'].lower()
                     # Проверяем, содержит ли имя функции/события ключевое слово
-                    if any(keyword in item_name for keyword in self._keywords):
-                        logger.info(f"ABI Filter HIT: Found keyword in '{item_name}'.")
+                    if self._keywords_regex.search(item['name']):
+                        logger.info("ABI Filter HIT: Found keyword in '%s'.", item['name'])
                         return True
                         
             return False
             
-        except json.JSONDecodeError:
-            logger.warning(f"Failed to decode ABI JSON: {abi_str[:200]}")
+        except orjson.JSONDecodeError:
+            logger.warning("Failed to decode ABI JSON: %s", abi_str[:200])
             return False
         except Exception as e:
-            logger.error(f"Error checking ABI: {e}", exc_info=True)
+            logger.error("Error checking ABI: %s", e, exc_info=True)
             return False
\ No newline at end of file
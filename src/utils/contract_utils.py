@@ -1,12 +1,32 @@
+import functools
+import hashlib
 import logging
-import json
 from typing import Dict, Any, Optional, Tuple
 from eth_utils import function_signature_to_4byte_selector, to_checksum_address
 from eth_abi import decode
-import codecs
 
 logger = logging.getLogger(__name__)
 
+def source_code_hash(source_code_json: str) -> bytes:
+    """
+    Короткий (16 байт) хэш исходного кода для ключей кэшей.
+    Одинаковые шаблоны (фабрики, форки) дают один и тот же ключ.
+    """
+    return hashlib.blake2b(source_code_json.encode('utf-8', errors='surrogatepass'), digest_size=16).digest()
+
+@functools.lru_cache(maxsize=8192)
+def _sig_to_selector(signature: str) -> str:
+    """
+    Вычисляет селектор (0x + 4 байта keccak) по сигнатуре функции.
+    Стандартные сигнатуры повторяются во множестве контрактов, поэтому кэшируем.
+    """
+    return "0x" + function_signature_to_4byte_selector(signature).hex()
+
+@functools.lru_cache(maxsize=16384)
+def _checksum_address(address: str) -> str:
+    """Кэшированный to_checksum_address: адреса токенов постоянно повторяются."""
+    return to_checksum_address(address)
+
 def get_function_selector(func_abi: Dict[str, Any]) -> Optional[str]:
     """
     Генерирует селектор функции (4 байта) из её ABI.
@@ -14,43 +34,37 @@ def get_function_selector(func_abi: Dict[str, Any]) -> Optional[str]:
     """
     try:
         if func_abi.get('type') != 'function':
-            logger.warning(f"ABI item is not a function: {func_abi}")
+            logger.warning("ABI item is not a function: %s", func_abi)
             return None
             
         func_name = func_abi.get('name')
         if not func_name:
-            logger.warning(f"Function ABI missing 'name': {func_abi}")
+            logger.warning("Function ABI missing 'name': %s", func_abi)
             return None
             
         inputs = func_abi.get('inputs', [])
         # Проверяем, что inputs это список словарей с ключом 'type'
         if not isinstance(inputs, list):
-             logger.warning(f"Function ABI has invalid 'inputs' format: {inputs}")
+             logger.warning("Function ABI has invalid 'inputs' format: %s", inputs)
              return None
         
         input_types_list = []
         for inp in inputs:
             if not isinstance(inp, dict) or 'type' not in inp:
-                 logger.warning(f"Invalid input item in ABI: {inp}")
+                 logger.warning("Invalid input item in ABI: %s", inp)
                  return None
             input_types_list.append(inp['type'])
             
         input_types = ','.join(input_types_list)
         
         signature = f"{func_name}({input_types})"
-        logger.debug(f"Generated function signature: {signature}")
+        logger.debug("Generated function signature: %s", signature)
         
-        # function_signature_to_4byte_selector ожидает строку
-        selector_bytes = function_signature_to_4byte_selector(signature)
-        
-        # Конвертируем байты селектора в hex-строку 0x...
-        selector_hex = codecs.encode(selector_bytes, 'hex').decode('ascii')
-        
-        return f"0x{selector_hex}"
+        return _sig_to_selector(signature)
         
     except Exception as e:
         # Логируем ошибку вместе с ABI, вызвавшим ее
-        logger.error(f"Failed to generate function selector for ABI {json.dumps(func_abi)}: {e}", exc_info=True)
+        logger.error("Failed to generate function selector for ABI %s: %s", func_abi, e, exc_info=True)
         return None
 
 def decode_address_from_eth_call(result: str) -> Optional[str]:
@@ -59,9 +73,17 @@ def decode_address_from_eth_call(result: str) -> Optional[str]:
     Предполагается, что функция возвращала один address.
     """
     if not result or not result.startswith("0x") or len(result) < 66: # 0x + 64 hex chars
-        logger.warning(f"Invalid eth_call result for address decoding: {result}")
+        logger.warning("Invalid eth_call result for address decoding: %s", result)
         return None
         
+    # Быстрый путь: адрес - это последние 20 байт первого 32-байтного слова,
+    # первые 12 байт должны быть нулевыми
+    if not result[2:26].lstrip('0'):
+        try:
+            return _checksum_address('0x' + result[26:66])
+        except ValueError:
+            pass # Не-hex символы: пусть разбирается eth_abi ниже
+
     try:
         # Убираем '0x' и конвертируем hex в байты
         result_bytes = bytes.fromhex(result[2:])
@@ -72,13 +94,13 @@ def decode_address_from_eth_call(result: str) -> Optional[str]:
             # Преобразуем в checksum-адрес для единообразия
             return to_checksum_address(decoded_tuple[0])
         else:
-             logger.warning(f"Decoding eth_call result did not yield an address: {decoded_tuple}")
+             logger.warning("Decoding eth_call result did not yield an address: %s", decoded_tuple)
              return None
     except ValueError as e: # Ошибка при bytes.fromhex
-         logger.error(f"Failed to convert hex result to bytes: {result}. Error: {e}")
+         logger.error("Failed to convert hex result to bytes: %s. Error: %s", result, e)
          return None
     except Exception as e: # Другие ошибки декодирования
-        logger.error(f"Failed to decode address from eth_call result {result}: {e}", exc_info=True)
+        logger.error("Failed to decode address from eth_call result %s: %s", result, e, exc_info=True)
         return None
 
 def decode_timestamp_from_eth_call(result: str) -> Optional[int]:
@@ -88,12 +110,19 @@ def decode_timestamp_from_eth_call(result: str) -> Optional[int]:
     Возвращает None, если результат - ошибка.
     """
     if not result or not result.startswith("0x"):
-        logger.warning(f"Invalid eth_call result for timestamp decoding: {result}")
+        logger.warning("Invalid eth_call result for timestamp decoding: %s", result)
         return None
         
     try:
-        # Пытаемся конвертировать hex в int
-        timestamp = int(result, 16)
+        digits = result[2:]
+        # uint256 выровнен по правому краю: timestamp умещается в последние 16 hex-символов.
+        # Если старшая часть не нулевая, значение заведомо больше любого валидного timestamp
+        if len(digits) > 16 and digits[:-16].lstrip('0'):
+            logger.warning("Decoded timestamp from %s seems too large to be valid. Treating as invalid.", result)
+            return None
+
+        # Пытаемся конвертировать hex в int (не более 16 символов)
+        timestamp = int(digits[-16:], 16)
         
         if timestamp == 0:
              logger.debug("eth_call returned 0 or '0x'.")
@@ -102,16 +131,16 @@ def decode_timestamp_from_eth_call(result: str) -> Optional[int]:
         # Простая эвристика, чтобы отсеять явный мусор (например, хэши)
         # Если timestamp больше 10,000,000,000 (01/05/2286) - это, вероятно, не дата.
         if timestamp > 10_000_000_000:
-             logger.warning(f"Decoded timestamp {timestamp} seems too large to be valid. Treating as invalid.")
+             logger.warning("Decoded timestamp %s seems too large to be valid. Treating as invalid.", timestamp)
              return None # Считаем мусором
              
         return timestamp
         
     except ValueError as e:
-        logger.error(f"Failed to decode timestamp from hex result {result}: {e}")
+        logger.error("Failed to decode timestamp from hex result %s: %s", result, e)
         return None
     except Exception as e:
-        logger.error(f"Unexpected error decoding timestamp {result}: {e}", exc_info=True)
+        logger.error("Unexpected error decoding timestamp %s: %s", result, e, exc_info=True)
         return None
 
 def is_code_empty(code_result: Optional[str]) -> bool:
@@ -122,6 +151,7 @@ def is_code_empty(code_result: Optional[str]) -> bool:
     Возвращает True, если:
     - code_result == "0x" (стандартный пустой)
     - code_result == "0x0" или "0x00" и т.д. (любое значение, равное 0)
+    - то же в другом регистре, с пробелами или без префикса ("0X00", " 0x ", "0")
     
     Возвращает False, если:
     - code_result is None (ошибка API или невалидный ответ)
@@ -132,20 +162,23 @@ def is_code_empty(code_result: Optional[str]) -> bool:
         # Безопаснее считать, что он НЕ пуст, и повторить попытку в след. цикле.
         return False 
 
-    if code_result == "0x":
+    # Провайдеры отличаются регистром префикса и пробелами: '0X00', ' 0x ', '0'
+    normalized = code_result.strip().lower()
+
+    if normalized == "0x":
         # Стандартный ответ для EOA или уничтоженного контракта
         return True
 
     try:
-        # Пытаемся интерпретировать как число. 
-        # '0x0', '0x00', '0x000000' все равны 0.
-        # '0x123...' будет > 0.
-        code_int = int(code_result, 16)
-        return code_int == 0
+        if normalized.startswith("0x"):
+            # Не парсим байткод в int: достаточно проверить, что после '0x' одни нули.
+            # '0x0', '0x00', '0x000000' - пустой код, '0x123...' - есть код.
+            return not normalized[2:].lstrip('0')
+        # Значение без префикса: '0', '00' - пустой код
+        return int(normalized, 16) == 0
     except ValueError:
-        # '0x' был обработан. Если здесь ошибка, это '0x' с не-hex символами
-        logger.warning(f"is_code_empty received non-hex value: {code_result}")
+        logger.warning("is_code_empty received non-hex value: %s", code_result)
         return False # Не можем доказать, что он пуст
     except Exception as e:
-        logger.error(f"is_code_empty unexpected error on {code_result}: {e}")
+        logger.error("is_code_empty unexpected error on %s: %s", code_result, e)
         return False # Безопаснее считать, что он не пуст
\ No newline at end of file
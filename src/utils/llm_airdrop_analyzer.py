@@ -1,28 +1,97 @@
+import asyncio
 import logging
-import json
-from typing import Dict, Any, Optional
+import orjson
+import re
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from cachetools import LRUCache, cached
 
 from ..providers.openai_compatible_api_client import OpenAICompatibleClient, OpenAIAPIError
-from .prompts.airdrop_contract_scanner_analyzer import SYSTEM_PROMPT
+from .prompts.airdrop_contract_scanner_analyzer import SYSTEM_PROMPT, RESPONSE_SCHEMA
+from .contract_utils import source_code_hash
 
 logger = logging.getLogger(__name__)
 
+# Лимит кэша сплющенных исходников - по суммарной длине (символов), а не по числу записей:
+# один Standard JSON Input может весить десятки мегабайт
+_FLAT_SOURCE_CACHE_MAX_CHARS = 64 * 1024 * 1024
+
+# Конечные статусы batch-задачи. 'expired' и 'cancelled' могут содержать часть результатов
+_BATCH_FINISHED_STATUSES = ('completed', 'expired', 'cancelled')
+# Batch не прошел валидацию входного файла - результатов не будет
+_BATCH_FAILED_STATUSES = ('failed',)
+
+# Результат "модель уверенно ответила: не Airdrop" (валидный ответ без eligibility-функции).
+# Пустой (falsy), чтобы проверки `if not result` работали как раньше; отличать от None - по `is`.
+# None означает, что вердикта нет: пустой или некорректный ответ модели
+# Неизменяемый: один и тот же объект возвращается всем вызывающим
+NOT_AIRDROP: MappingProxyType = MappingProxyType({})
+
+# Результат анализа: данные Airdrop-контракта, NOT_AIRDROP или None (вердикта нет)
+LLMAnalysisResult = Union[Dict[str, Any], MappingProxyType, None]
+
+# Structured outputs: провайдер сам гарантирует соответствие ответа схеме при генерации
+_RESPONSE_FORMAT_JSON_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {"name": "AirdropAnalysis", "strict": True, "schema": RESPONSE_SCHEMA}
+}
+# Для провайдеров без поддержки json_schema: гарантирован только валидный JSON
+_RESPONSE_FORMAT_JSON_OBJECT = {"type": "json_object"}
+
+# Файлы сторонних библиотек: модели они известны, поэтому отправляется только их путь
+_LIBRARY_SOURCE_PATH_RE = re.compile(
+    r'(^|/)(@openzeppelin|@chainlink|node_modules|forge-std|openzeppelin-contracts(-upgradeable)?)/'
+)
+# Тесты и фикстуры к логике контракта не относятся и не отправляются вовсе
+_TEST_SOURCE_PATH_RE = re.compile(r'(^|/)tests?/|\.t\.sol$')
+
+# Системное сообщение собирается один раз при импорте и всегда идет первым и байт-в-байт
+# одинаковым: так провайдер (OpenAI, vLLM с --enable-prefix-caching) переиспользует
+# уже обработанный префикс промпта вместо повторного prefill
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+# Вариант с явной разметкой кэша (Anthropic-совместимые API кэшируют только помеченные блоки)
+_SYSTEM_MESSAGE_CACHE_CONTROL = {
+    "role": "system",
+    "content": [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+}
+
 class LLMAirdropAnalyzer:
     """
     Использует LLM-клиент для анализа исходного кода и ABI контракта
     на предмет логики Airdrop.
     """
-    def __init__(self, client: OpenAICompatibleClient):
+    def __init__(self,
+                 client: OpenAICompatibleClient,
+                 prompt_cache_control: bool = False,
+                 max_source_chars: int = 0,
+                 structured_output: bool = False):
+        """
+        :param client: Клиент OpenAI-совместимого API.
+        :param prompt_cache_control: Помечать системный промпт как кэшируемый (cache_control).
+                                     Нужно для Anthropic-совместимых API; OpenAI и vLLM кэшируют префикс сами.
+        :param max_source_chars: Максимальная длина исходного кода в запросе (символов). 0 - без ограничения.
+        :param structured_output: Требовать ответ по JSON-схеме (response_format: json_schema, strict).
+                                  False - только json_object, для провайдеров без поддержки схем.
+        """
         self._client = client
+        self._max_source_chars = max_source_chars
+        self._response_format = _RESPONSE_FORMAT_JSON_SCHEMA if structured_output else _RESPONSE_FORMAT_JSON_OBJECT
+        self._system_message = _SYSTEM_MESSAGE_CACHE_CONTROL if prompt_cache_control else _SYSTEM_MESSAGE
         logger.info("LLMAirdropAnalyzer initialized.")
 
-    def _flatten_source_code(self, source_code_json: str) -> str:
+    @staticmethod
+    @cached(cache=LRUCache(maxsize=_FLAT_SOURCE_CACHE_MAX_CHARS, getsizeof=len), key=source_code_hash)
+    def _flatten_source_code(source_code_json: str) -> str:
         """
         Преобразует JSON с исходным кодом в единую строку.
+        Файлы библиотек заменяются заголовком с путем, тесты пропускаются.
+        Результат кэшируется по хэшу исходника: одинаковые шаблоны не разбираются повторно.
         """
         try:
-            data = json.loads(source_code_json)
-        except json.JSONDecodeError:
+            data = orjson.loads(source_code_json)
+        except orjson.JSONDecodeError:
             logger.warning("Failed to parse source_code JSON for LLM. Sending raw.")
             return source_code_json
 
@@ -30,13 +99,24 @@ class LLMAirdropAnalyzer:
             return data['source']
 
         if 'sources' in data:
-            # Объединяем все файлы в одну строку
-            all_code = []
-            for file_path, content_obj in data['sources'].items():
-                all_code.append(f"// --- File: {file_path} ---\n\n")
-                all_code.append(content_obj.get('content', ''))
-                all_code.append("\n\n")
-            return "".join(all_code)
+            sources = data['sources']
+            own_files = [
+                file_path for file_path in sources
+                if not _LIBRARY_SOURCE_PATH_RE.search(file_path) and not _TEST_SOURCE_PATH_RE.search(file_path)
+            ]
+            if not own_files:
+                # Весь код лежит в "библиотечных" путях - отправляем как есть, иначе модели нечего анализировать
+                own_files = list(sources)
+            own_files_set = set(own_files)
+
+            # Объединяем все файлы в одну строку (один проход, одна итоговая строка)
+            return "".join(
+                f"// --- File: {file_path} ---\n\n{content_obj.get('content', '')}\n\n"
+                if file_path in own_files_set else
+                f"// --- File: {file_path} (library, source omitted) ---\n\n"
+                for file_path, content_obj in sources.items()
+                if file_path in own_files_set or not _TEST_SOURCE_PATH_RE.search(file_path)
+            )
         
         logger.warning("Unknown source_code structure for LLM. Sending raw.")
         return source_code_json
@@ -47,8 +127,11 @@ class LLMAirdropAnalyzer:
         """
         # 1. Сплющиваем исходный код
         flat_source_code = self._flatten_source_code(source_code_json)
+        if self._max_source_chars and len(flat_source_code) > self._max_source_chars:
+            logger.warning("Source code for LLM truncated from %s to %s chars.", len(flat_source_code), self._max_source_chars)
+            flat_source_code = flat_source_code[:self._max_source_chars]
         
-        # 2. Формируем user prompt
+        # 2. Формируем user prompt (соседние литералы склеиваются компилятором в одну f-строку)
         user_content = (
             "Here is the smart contract source code:\n"
             "```solidity\n"
@@ -61,48 +144,56 @@ class LLMAirdropAnalyzer:
             "Analyze the contract based on your instructions and provide ONLY the JSON response."
         )
         
-        # 3. Собираем payload
-        payload = {
+        # 3. Собираем payload: системное сообщение и response_format - общие константы, новый только user
+        return {
             "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
+                self._system_message,
                 {"role": "user", "content": user_content}
             ],
-            # Эта опция заставляет модель гарантированно вернуть JSON
-            "response_format": {"type": "json_object"} 
+            # Эта опция заставляет модель гарантированно вернуть JSON (по схеме, если она включена)
+            "response_format": self._response_format
         }
-        return payload
 
-    def _validate_llm_response(self, response_str: str) -> Optional[Dict[str, Any]]:
+    def _validate_llm_response(self, response_str: str) -> LLMAnalysisResult:
         """
         Валидирует ответ от LLM.
+
+        :return: Данные Airdrop-контракта; NOT_AIRDROP, если модель ответила, что это не Airdrop;
+                 None, если ответ не удалось разобрать.
         """
         try:
-            data = json.loads(response_str)
-        except json.JSONDecodeError:
-            logger.warning(f"LLM response was not valid JSON. Response: {response_str[:200]}")
+            data = orjson.loads(response_str)
+        except orjson.JSONDecodeError:
+            logger.warning("LLM response was not valid JSON. Response: %s", response_str[:200])
             return None # Не JSON
             
         if not isinstance(data, dict):
-            logger.warning(f"LLM response was not a JSON object. Response: {data}")
+            logger.warning("LLM response was not a JSON object. Response: %s", data)
             return None # Не объект
 
+        # ГЛАВНАЯ ПРОВЕРКА: функция проверки eligibility найдена.
+        # Для не-Airdrop контрактов модель возвращает null в этом поле (или пустой объект {})
         if not data:
             logger.info("LLM returned an empty JSON object. Contract is not an airdrop.")
-            return None # Пустой JSON {}
-            
-        # ГЛАВНАЯ ПРОВЕРКА: наличие обязательного поля
+            return NOT_AIRDROP
+
         if 'eligibility_function_abi' not in data:
-            logger.warning(f"LLM response is missing required key 'eligibility_function_abi'. Response: {data}")
+            logger.warning("LLM response is missing required key 'eligibility_function_abi'. Response: %s", data)
             return None
+
+        if not data['eligibility_function_abi']:
+            logger.info("LLM found no eligibility function. Contract is not an airdrop.")
+            return NOT_AIRDROP
             
-        logger.info(f"LLM validation successful. Found eligibility function.")
+        logger.info("LLM validation successful. Found eligibility function.")
         return data
 
-    async def analyze_contract(self, source_code_json: str, abi_json: str) -> Optional[Dict[str, Any]]:
+    async def analyze_contract(self, source_code_json: str, abi_json: str) -> LLMAnalysisResult:
         """
         Выполняет полный цикл анализа LLM.
         
-        :return: Словарь с данными, если это Airdrop, иначе None.
+        :return: Словарь с данными, если это Airdrop; NOT_AIRDROP, если модель ответила, что это не Airdrop;
+                 None, если ответ пустой или некорректный (вердикта нет).
         """
         try:
             payload = self._prepare_payload(source_code_json, abi_json)
@@ -116,10 +207,65 @@ class LLMAirdropAnalyzer:
             
         except OpenAIAPIError as e:
             # Ошибка API, таймаут, и т.д.
-            logger.error(f"LLM API error during analysis: {e}")
+            logger.error("LLM API error during analysis: %s", e)
             # Выбрасываем исключение, чтобы транзакция откатилась
             raise
         except Exception as e:
-            logger.error(f"Unexpected error during LLM analysis: {e}", exc_info=True)
+            logger.error("Unexpected error during LLM analysis: %s", e, exc_info=True)
             # Выбрасываем исключение, чтобы транзакция откатилась
-            raise
\ No newline at end of file
+            raise
+
+    async def submit_batch(self, items: List[Tuple[str, str, str]]) -> str:
+        """
+        Отправляет контракты на анализ через Batch API (дешевле, но результат - в течение 24 часов).
+        Подходит для фоновых пересканирований, а не для интерактивных запросов.
+
+        :param items: Список (custom_id, source_code_json, abi_json); custom_id - например, адрес контракта.
+        :return: ID batch-задачи.
+        """
+        requests = [
+            {"custom_id": custom_id, "payload": self._prepare_payload(source_code_json, abi_json)}
+            for custom_id, source_code_json, abi_json in items
+        ]
+        return await self._client.create_batch(requests)
+
+    async def wait_for_batch(self, batch_id: str, poll_interval: float = 30) -> Dict[str, LLMAnalysisResult]:
+        """
+        Ждет завершения batch-задачи и валидирует ответы так же, как analyze_contract.
+        Читаются оба файла: результатов (output_file_id) и ошибок (error_file_id).
+
+        :return: Словарь custom_id -> результат (как у analyze_contract; None, если запрос не удался).
+                 Запросы, которых нет ни в одном файле (например, не успели выполниться
+                 до истечения batch), в словарь не попадают.
+        """
+        while True:
+            batch = await self._client.get_batch(batch_id)
+            status = batch.get('status')
+
+            if status in _BATCH_FINISHED_STATUSES:
+                break
+            if status in _BATCH_FAILED_STATUSES:
+                logger.error("LLM batch %s finished with status '%s': %s", batch_id, status, batch.get('errors'))
+                raise OpenAIAPIError(f"Batch {batch_id} finished with status '{status}'")
+
+            logger.info("LLM batch %s status: %s. Next check in %ss.", batch_id, status, poll_interval)
+            await asyncio.sleep(poll_interval)
+
+        if status != 'completed':
+            logger.warning("LLM batch %s finished with status '%s'. Results may be partial.", batch_id, status)
+
+        output_file_id = batch.get('output_file_id')
+        error_file_id = batch.get('error_file_id')
+        if not output_file_id:
+            logger.warning("LLM batch %s finished without an output file.", batch_id)
+
+        responses: Dict[str, Optional[str]] = {}
+        # Ошибочные запросы Batch API пишет в отдельный файл - для них результат None
+        for file_id in (error_file_id, output_file_id):
+            if file_id:
+                responses.update(await self._client.get_batch_results(file_id))
+
+        return {
+            custom_id: self._validate_llm_response(response_str) if response_str else None
+            for custom_id, response_str in responses.items()
+        }
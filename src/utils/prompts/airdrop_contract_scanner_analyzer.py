@@ -3,14 +3,14 @@ Your task is to analyze the provided Solidity source code and ABI to identify if
 
 You MUST respond ONLY with a single, minified JSON object. Do NOT include markdown ticks (`json ... `), notes, or any conversational text.
 
-If the contract is NOT an Airdrop contract OR if you cannot find the primary eligibility function, you MUST return an empty JSON object: {}
+Always return a JSON object with ALL of the fields listed below.
 
-If it IS an Airdrop contract, you MUST return a JSON object with the following structure.
+If the contract is NOT an Airdrop contract OR if you cannot find the primary eligibility function, you MUST set every field to null.
 
-REQUIRED field (MUST be present):
+MAIN field:
 - "eligibility_function_abi": The full JSON ABI object for the function that checks if an address is eligible for the airdrop (e.g., a function named `isEligible`, `getClaimableAmount`, or one that takes a Merkle proof).
 
-OPTIONAL fields (return null if not found):
+OPTIONAL fields (null if not found):
 - "get_token_function_abi": The JSON ABI object for the function that *returns* the address of the airdropped token (e.g., a function named `token()` or `rewardToken()` and etc).
 - "token_address": The string address of the token being airdropped (if found directly, or if `get_token_function_abi` is not present).
 - "token_ticker": The string ticker symbol of the token (e.g., "TOKEN").
@@ -19,4 +19,56 @@ OPTIONAL fields (return null if not found):
 - "claim_end_getter_abi": The JSON ABI object for the function that returns the claim end time, OR the timestamp (integer) if it's a hardcoded block.timestamp or number.
 
 Your entire response must be ONLY the JSON object.
-"""
\ No newline at end of file
+"""
+
+# JSON Schema ответа для structured outputs (response_format: json_schema, strict).
+# В strict-режиме все поля обязательны, а "необязательность" выражается через null
+_ABI_PARAM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "type": {"type": "string"},
+        "internalType": {"type": ["string", "null"]},
+        "components": {"anyOf": [{"type": "array", "items": {"$ref": "#/$defs/abi_param"}}, {"type": "null"}]},
+    },
+    "required": ["name", "type", "internalType", "components"],
+    "additionalProperties": False,
+}
+
+_ABI_FUNCTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "type": {"type": "string"},
+        "name": {"type": "string"},
+        "inputs": {"type": "array", "items": {"$ref": "#/$defs/abi_param"}},
+        "outputs": {"type": "array", "items": {"$ref": "#/$defs/abi_param"}},
+        "stateMutability": {"type": "string"},
+    },
+    "required": ["type", "name", "inputs", "outputs", "stateMutability"],
+    "additionalProperties": False,
+}
+
+_NULLABLE_ABI_FUNCTION = {"anyOf": [{"$ref": "#/$defs/abi_function"}, {"type": "null"}]}
+_NULLABLE_ABI_FUNCTION_OR_TIMESTAMP = {"anyOf": [{"$ref": "#/$defs/abi_function"}, {"type": "integer"}, {"type": "null"}]}
+
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "eligibility_function_abi": _NULLABLE_ABI_FUNCTION,
+        "get_token_function_abi": _NULLABLE_ABI_FUNCTION,
+        "token_address": {"type": ["string", "null"]},
+        "token_ticker": {"type": ["string", "null"]},
+        "token_decimals": {"type": ["integer", "null"]},
+        "claim_start_getter_abi": _NULLABLE_ABI_FUNCTION_OR_TIMESTAMP,
+        "claim_end_getter_abi": _NULLABLE_ABI_FUNCTION_OR_TIMESTAMP,
+    },
+    "required": [
+        "eligibility_function_abi", "get_token_function_abi", "token_address", "token_ticker",
+        "token_decimals", "claim_start_getter_abi", "claim_end_getter_abi",
+    ],
+    "additionalProperties": False,
+    "$defs": {
+        "abi_param": _ABI_PARAM_SCHEMA,
+        "abi_function": _ABI_FUNCTION_SCHEMA,
+    },
+}
\ No newline at end of file
@@ -1,48 +1,393 @@
 import logging
-import json
+import orjson
 import asyncio
 import tempfile
 import os
-from typing import Dict, Any, Tuple
+import re
+import signal
+import sys
+from typing import Callable, Dict, Any, Iterable, List, MutableMapping, Optional, Sequence, Tuple
+
+from cachetools import LRUCache, cached
+
+from .contract_utils import source_code_hash
 
 logger = logging.getLogger(__name__)
 
+# Временный каталог анализа: исходники контракта лежат в подкаталоге _SOURCES_DIR,
+# а JSON-отчет Slither - рядом с ним. Пути исходников не могут выйти за _SOURCES_DIR
+# (проверка в _prepare_source_files), поэтому контракт не может подложить свой "отчет"
+_SOURCES_DIR = "sources"
+_SLITHER_OUTPUT_FILE = "slither_out.json"
+
+# Выражение версии из `pragma solidity ^0.8.20;`, `>=0.6.0 <0.9.0;`, `0.7.6;` и т.п.
+_PRAGMA_SOLIDITY_RE = re.compile(r'pragma\s+solidity\s+([^;]+);')
+# Одно условие выражения: оператор (может отсутствовать) и версия (minor/patch могут отсутствовать)
+_VERSION_COMPARATOR_RE = re.compile(r'(\^|~|>=|<=|>|<|=)?\s*(\d+)(?:\.(\d+))?(?:\.(\d+))?')
+
+Version = Tuple[int, int, int]
+# Условие над версией: (оператор сравнения, версия)
+Comparator = Tuple[str, Version]
+
+
+def _expand_comparator(op: str, parts: Tuple[Optional[str], ...]) -> List[Comparator]:
+    """
+    Переводит одно условие pragma в простые сравнения (>=, <, <=, >, ==) по правилам semver.
+    """
+    major = int(parts[0])
+    minor = int(parts[1]) if parts[1] is not None else None
+    patch = int(parts[2]) if parts[2] is not None else None
+    version = (major, minor or 0, patch or 0)
+
+    if op in ('', '='):
+        if patch is not None:
+            return [('==', version)]
+        # Неполная версия (`0.8`) означает всю серию
+        upper = (major, minor + 1, 0) if minor is not None else (major + 1, 0, 0)
+        return [('>=', version), ('<', upper)]
+
+    if op == '^':
+        # Первая ненулевая компонента не меняется: ^0.8.1 -> <0.9.0, ^0.0.3 -> <0.0.4
+        if major > 0 or minor is None:
+            upper = (major + 1, 0, 0)
+        elif minor > 0 or patch is None:
+            upper = (0, minor + 1, 0)
+        else:
+            upper = (0, 0, patch + 1)
+        return [('>=', version), ('<', upper)]
+
+    if op == '~':
+        upper = (major, minor + 1, 0) if minor is not None else (major + 1, 0, 0)
+        return [('>=', version), ('<', upper)]
+
+    return [(op, version)]
+
+
+def parse_solidity_pragma(expression: str) -> List[List[Comparator]]:
+    """
+    Разбирает выражение версии из `pragma solidity`.
+
+    :return: Список альтернатив (разделитель `||`); версия подходит, если выполнены
+             все условия хотя бы одной альтернативы.
+    """
+    alternatives = []
+    for alternative in expression.split('||'):
+        comparators = []
+        for match in _VERSION_COMPARATOR_RE.finditer(alternative):
+            comparators.extend(_expand_comparator(match.group(1) or '', match.groups()[1:]))
+        if comparators:
+            alternatives.append(comparators)
+    return alternatives
+
+
+def _version_satisfies(version: Version, alternatives: List[List[Comparator]]) -> bool:
+    for comparators in alternatives:
+        if all(
+            (op == '==' and version == bound) or
+            (op == '>=' and version >= bound) or
+            (op == '>' and version > bound) or
+            (op == '<=' and version <= bound) or
+            (op == '<' and version < bound)
+            for op, bound in comparators
+        ):
+            return True
+    return False
+
+# Лимит кэша разобранных исходников - по суммарной длине (символов), а не по числу записей:
+# один Standard JSON Input может весить десятки мегабайт
+_SOURCE_FILES_CACHE_MAX_CHARS = 64 * 1024 * 1024
+
+
+def _source_files_size(files: Tuple[Tuple[str, str], ...]) -> int:
+    return sum(len(path) + len(content) for path, content in files)
+
+# Скрипт долгоживущего обработчика (запускается по пути, см. slither_worker.py)
+_SLITHER_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "slither_worker.py")
+
+# Лимит длины строки ответа обработчика (stderr solc может быть большим)
+_SLITHER_WORKER_STREAM_LIMIT = 16 * 1024 * 1024
+
+
+def _kill_process_tree(process: asyncio.subprocess.Process) -> None:
+    """
+    Убивает процесс вместе с дочерними (solc). Процесс должен быть запущен
+    с start_new_session=True: тогда его pid совпадает с id группы процессов.
+    """
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class SlitherWorkerUnavailableError(RuntimeError):
+    """Пул не смог запустить процесс-обработчик Slither."""
+    pass
+
+
+class SlitherWorkerPool:
+    """
+    Пул долгоживущих процессов Slither.
+
+    Каждый обработчик импортирует Slither один раз, а затем выполняет прогоны
+    по запросам через stdin/stdout. Это убирает запуск интерпретатора и импорт
+    Slither (~1-2 с) на каждый контракт. Упавший или зависший обработчик
+    заменяется новым; каждый обработчик перезапускается после max_jobs прогонов,
+    чтобы не накапливать утечки памяти Slither.
+
+    Очередь _idle хранит ровно size слотов: процесс или None (слот без процесса).
+    Новый процесс для пустого слота запускается при следующем прогоне, а не в finally
+    завершившегося: отмена или ошибка запуска не теряют слот.
+    """
+
+    def __init__(self, size: int, timeout: float = 300, max_jobs: int = 200):
+        """
+        :param size: Число процессов-обработчиков (параллельных прогонов Slither).
+        :param timeout: Максимальное время одного прогона (секунды); по истечении обработчик убивается.
+        :param max_jobs: Число прогонов, после которого обработчик перезапускается. 0 - без перезапуска.
+        """
+        if size < 1:
+            raise ValueError("Slither worker pool size must be at least 1.")
+
+        self._size = size
+        self._timeout = timeout
+        self._max_jobs = max_jobs
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.subprocess.Process] = []
+        # Число выполненных прогонов каждого обработчика
+        self._jobs_done: Dict[asyncio.subprocess.Process, int] = {}
+        self._start_lock = asyncio.Lock()
+        self._started = False
+
+    async def _spawn_worker(self) -> asyncio.subprocess.Process:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, _SLITHER_WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            limit=_SLITHER_WORKER_STREAM_LIMIT,
+            # Своя группа процессов: при таймауте убиваем обработчик вместе с solc
+            start_new_session=True
+        )
+        self._workers.append(process)
+        self._jobs_done[process] = 0
+        logger.info("Slither worker started (pid %s).", process.pid)
+        return process
+
+    async def _ensure_started(self) -> None:
+        # Процессы создаются лениво, внутри работающего event loop
+        if self._started:
+            return
+        async with self._start_lock:
+            if self._started:
+                return
+            for _ in range(self._size):
+                self._idle.put_nowait(None)
+            self._started = True
+
+    async def _acquire_worker(self) -> asyncio.subprocess.Process:
+        """Берет свободный обработчик; для пустого слота запускает новый процесс."""
+        process = await self._idle.get()
+        if process is not None:
+            return process
+        try:
+            return await self._spawn_worker()
+        except BaseException as e:
+            # Слот возвращается пустым: следующий прогон попробует запустить процесс снова
+            self._idle.put_nowait(None)
+            if isinstance(e, Exception):
+                raise SlitherWorkerUnavailableError(f"Failed to start Slither worker: {e!r}") from e
+            raise
+
+    async def _discard_worker(self, process: asyncio.subprocess.Process) -> None:
+        if process in self._workers:
+            self._workers.remove(process)
+        self._jobs_done.pop(process, None)
+        _kill_process_tree(process)
+        await process.wait()
+
+    async def _retire_worker(self, process: asyncio.subprocess.Process) -> None:
+        """Штатно завершает исправный обработчик (закрытие stdin завершает его цикл)."""
+        if process in self._workers:
+            self._workers.remove(process)
+        self._jobs_done.pop(process, None)
+        process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            _kill_process_tree(process)
+            await process.wait()
+
+    async def run(self, target_path: str, out_path: str, extra_args: Sequence[str] = ()) -> Tuple[int, str]:
+        """
+        Выполняет `slither . --json out_path [extra_args]` в каталоге target_path на свободном обработчике.
+
+        :return: (код возврата Slither, stderr).
+        """
+        await self._ensure_started()
+        process = await self._acquire_worker()
+        healthy = False
+        try:
+            request = {"cwd": target_path, "out": out_path, "args": list(extra_args)}
+            process.stdin.write(orjson.dumps(request) + b'\n')
+            await process.stdin.drain()
+            try:
+                line = await asyncio.wait_for(process.stdout.readline(), timeout=self._timeout)
+            except asyncio.TimeoutError:
+                raise RuntimeError(f"Slither worker (pid {process.pid}) timed out after {self._timeout}s.") from None
+            if not line:
+                raise RuntimeError(f"Slither worker (pid {process.pid}) exited unexpectedly.")
+            response = orjson.loads(line)
+            healthy = True
+            return response['returncode'], response['stderr']
+        finally:
+            if healthy:
+                self._jobs_done[process] += 1
+                if self._max_jobs and self._jobs_done[process] >= self._max_jobs:
+                    logger.info("Recycling Slither worker (pid %s) after %s jobs.", process.pid, self._max_jobs)
+                    # Слот освобождается до ожидания завершения процесса
+                    self._idle.put_nowait(None)
+                    await self._retire_worker(process)
+                else:
+                    self._idle.put_nowait(process)
+            else:
+                # Обработчик в неизвестном состоянии (упал, завис или прогон отменен):
+                # убиваем, замена запустится при следующем прогоне
+                self._idle.put_nowait(None)
+                await self._discard_worker(process)
+
+    async def close(self) -> None:
+        """Завершает все процессы-обработчики."""
+        workers, self._workers = self._workers, []
+        for process in workers:
+            if process.returncode is None:
+                process.stdin.close()
+        for process in workers:
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                _kill_process_tree(process)
+                await process.wait()
+        self._jobs_done.clear()
+        self._idle = asyncio.Queue()
+        self._started = False
+
+
 class SlitherAnalyzer:
     """
     Обертка для запуска анализатора Slither на исходном коде контракта.
     """
 
-    def __init__(self):
+    def __init__(self,
+                 result_cache: Optional[MutableMapping[bytes, bytes]] = None,
+                 worker_pool: Optional[SlitherWorkerPool] = None,
+                 solc_versions: Iterable[str] = (),
+                 timeout: float = 300):
+        """
+        :param result_cache: Хранилище успешных отчетов Slither: хэш исходника -> отчет (JSON в bytes).
+                             Компиляция детерминирована, поэтому одинаковый код повторно не анализируется.
+                             None - без кэширования.
+        :param worker_pool: Пул долгоживущих процессов Slither.
+                            None - отдельный процесс `slither` на каждый вызов.
+        :param solc_versions: Заранее установленные через solc-select версии solc (например, в образе Docker).
+                              Версия для контракта выбирается по pragma, без загрузки компилятора.
+                              Пусто - всегда используется глобальная версия solc-select.
+        :param timeout: Максимальное время прогона отдельного процесса `slither` (секунды).
+                        Для пула обработчиков таймаут задается в самом пуле.
+        """
+        self._result_cache = result_cache
+        self._worker_pool = worker_pool
+        self._timeout = timeout
+        # Сортированный список (major, minor, patch) для выбора по pragma
+        self._solc_versions = sorted(tuple(int(part) for part in v.split('.')) for v in solc_versions)
         logger.info("SlitherAnalyzer initialized.")
 
-    async def _run_slither(self, target_path: str) -> Dict[str, Any]:
+    def _select_solc_version(self, files: Tuple[Tuple[str, str], ...]) -> Optional[str]:
+        """
+        Подбирает установленную версию solc, удовлетворяющую pragma всех исходников
+        (точные версии, `^`, `~`, диапазоны `>= <`, альтернативы `||`). Берется самая новая.
+
+        :return: Версия (например, "0.7.6") или None, если подходящей нет (тогда используется глобальная).
         """
-        Запускает Slither в подпроцессе во временном каталоге.
+        if not self._solc_versions:
+            return None
+
+        constraints = [
+            parse_solidity_pragma(match.group(1))
+            for _, content in files
+            for match in _PRAGMA_SOLIDITY_RE.finditer(content)
+        ]
+        constraints = [alternatives for alternatives in constraints if alternatives]
+        if not constraints:
+            return None
+
+        for version in reversed(self._solc_versions):
+            if all(_version_satisfies(version, alternatives) for alternatives in constraints):
+                return '.'.join(map(str, version))
+
+        logger.warning("No installed solc version satisfies the contract pragmas. Using the default solc version.")
+        return None
+
+    async def _exec_slither(self, target_path: str, out_path: str, extra_args: Sequence[str] = ()) -> Tuple[int, str]:
         """
-        logger.debug(f"Running Slither in directory: {target_path}")
+        Запускает `slither . --json out_path [extra_args]` в каталоге target_path.
+
+        :return: (код возврата, stderr).
+        """
+        if self._worker_pool is not None:
+            try:
+                return await self._worker_pool.run(target_path, out_path, extra_args)
+            except SlitherWorkerUnavailableError as e:
+                logger.error("%s Falling back to a standalone slither process.", e)
+
         process = await asyncio.create_subprocess_exec(
-            'slither', '.', '--json', '-', cwd=target_path,
-            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            'slither', '.', '--json', out_path, *extra_args, cwd=target_path,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+            start_new_session=True
         )
-        stdout, stderr = await process.communicate()
-        stderr_str = stderr.decode('utf-8', errors='ignore').strip()
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout=self._timeout)
+        except BaseException:
+            # Таймаут или отмена: не оставляем зависший slither/solc
+            _kill_process_tree(process)
+            await process.wait()
+            raise
+        return process.returncode, stderr.decode('utf-8', errors='ignore')
+
+    async def _run_slither(self, target_path: str, out_path: str, solc_version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Запускает Slither во временном каталоге (в пуле обработчиков или в отдельном подпроцессе).
+
+        :param out_path: Путь для JSON-отчета; должен быть вне target_path и еще не существовать
+                         (Slither не перезаписывает отчет).
+        :param solc_version: Установленная версия solc (solc-select). None - глобальная версия.
+        """
+        logger.debug("Running Slither in directory: %s", target_path)
+        # JSON-отчет пишется в файл, а не в stdout: в памяти не копится весь вывод процесса.
+        extra_args = ('--solc-solcs-select', solc_version) if solc_version else ()
+        returncode, stderr = await self._exec_slither(target_path, out_path, extra_args)
+        stderr_str = stderr.strip()
 
         if stderr_str:
-             logger.warning(f"Slither stderr (dir: {target_path}):\n{stderr_str}")
+             logger.warning("Slither stderr (dir: %s):\n%s", target_path, stderr_str)
 
         slither_result: Dict[str, Any] = {} 
-        if stdout:
+        output = b''
+        if os.path.isfile(out_path):
+            with open(out_path, 'rb') as f:
+                output = f.read()
+
+        if output:
             try:
-                slither_result = json.loads(stdout.decode('utf-8', errors='ignore'))
-                logger.debug(f"Slither finished parsing stdout. Success: {slither_result.get('success')}. Return code: {process.returncode}")
-            except json.JSONDecodeError:
-                logger.error(f"Failed to decode Slither JSON output despite receiving stdout. Output: {stdout.decode('utf-8', errors='ignore')[:500]}")
+                slither_result = orjson.loads(output)
+                logger.debug("Slither finished parsing output. Success: %s. Return code: %s", slither_result.get('success'), returncode)
+            except orjson.JSONDecodeError:
+                logger.error("Failed to decode Slither JSON output despite receiving output. Output: %s", output[:500].decode('utf-8', errors='ignore'))
                 slither_result = {"success": False, "results": {}}
                 slither_result["error"] = "JSONDecodeError" 
         else:
-            logger.warning(f"Slither failed with empty stdout. Return code: {process.returncode}.")
+            logger.warning("Slither failed with empty output. Return code: %s.", returncode)
             slither_result = {"success": False, "results": {}}
-            slither_result["error"] = "Empty stdout" 
+            slither_result["error"] = "Empty output" 
 
         if slither_result.get("error") is None: 
             slither_result["error"] = "" 
@@ -59,94 +404,156 @@ class SlitherAnalyzer:
 
         return slither_result
 
-    def _prepare_source_files(self, temp_dir: str, source_code_json_str: str) -> str:
+    @staticmethod
+    @cached(cache=LRUCache(maxsize=_SOURCE_FILES_CACHE_MAX_CHARS, getsizeof=_source_files_size), key=source_code_hash)
+    def _parse_source_files(source_code_json_str: str) -> Tuple[Tuple[str, str], ...]:
         """
-        Распаковывает JSON с исходным кодом во временные файлы.
+        Разбирает JSON с исходным кодом в список (относительный путь, содержимое).
         Ожидает либо {"source": "..."} либо стандартный JSON Input.
+        Результат кэшируется по хэшу исходника: при повторе остается только запись файлов.
         """
         source_data: Any = None
         try:
-            source_data = json.loads(source_code_json_str)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse source_code JSON: {e}. Content: {source_code_json_str[:200]}")
+            source_data = orjson.loads(source_code_json_str)
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to parse source_code JSON: %s. Content: %s", e, source_code_json_str[:200])
             raise ValueError("Invalid source_code JSON structure") from e
 
-        
-        # 1. Получаем абсолютный, канонический путь к временной папке
-        safe_temp_dir = os.path.realpath(temp_dir)
-
         if isinstance(source_data, dict) and 'source' in source_data:
             # Для однофайловых контрактов имя файла жестко задано, это безопасно.
-            file_path = os.path.join(safe_temp_dir, "Contract.sol")
-            logger.debug(f"Writing single file: {file_path}")
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(source_data['source'])
-            return safe_temp_dir
+            return (("Contract.sol", source_data['source']),)
 
         elif isinstance(source_data, dict) and 'sources' in source_data:
-            logger.debug(f"Writing multiple files to: {safe_temp_dir}")
             sources = source_data['sources']
             if not isinstance(sources, dict):
                  raise ValueError("'sources' key does not contain a dictionary.")
-                 
+
+            files = []
             for relative_path, content_obj in sources.items():
                 if not isinstance(content_obj, dict) or 'content' not in content_obj:
-                    logger.warning(f"Skipping invalid source entry: {relative_path}")
+                    logger.warning("Skipping invalid source entry: %s", relative_path)
                     continue
-                
-                # 2. Формируем полный путь
-                full_path = os.path.realpath(os.path.join(safe_temp_dir, relative_path))
-
-                # 3. ПРОВЕРКА БЕЗОПАСНОСТИ:
-                # Убеждаемся, что итоговый путь (full_path) 
-                # все еще находится ВНУТРИ нашей временной папки (safe_temp_dir)
-                if os.path.commonprefix([safe_temp_dir, full_path]) != safe_temp_dir:
-                    logger.error(f"SECURITY ALERT: Path Traversal attempt detected. Blocked path: {relative_path}")
-                    # Прерываем всю операцию
-                    raise PermissionError(f"Path Traversal attempt detected: {relative_path}")
-
-                logger.debug(f"Writing file: {full_path}")
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                with open(full_path, 'w', encoding='utf-8') as f:
-                    f.write(content_obj['content'])
-            return safe_temp_dir
+                files.append((relative_path, content_obj['content']))
+            return tuple(files)
 
         else:
-            logger.error(f"Unknown source_code JSON structure: Expected 'source' or 'sources' key. Got: {str(source_data)[:200]}")
+            logger.error("Unknown source_code JSON structure: Expected 'source' or 'sources' key. Got: %s", str(source_data)[:200])
             raise ValueError("Unknown source_code JSON structure: Expected 'source' or 'sources' key.")
 
+    @staticmethod
+    def _write_source_file(full_path: str, data: bytes) -> None:
+        """
+        Записывает один файл исходника (выполняется в пуле потоков).
+        Напрямую через дескриптор, без объекта файла и буферизации Python.
+        """
+        fd = os.open(full_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view: # os.write может записать не все байты за один вызов
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+    async def _prepare_source_files(self, temp_dir: str, source_code_json_str: str) -> str:
+        """
+        Распаковывает JSON с исходным кодом во временные файлы.
+        Сначала проверяются все пути, затем каталоги создаются по одному разу,
+        а файлы записываются параллельно в пуле потоков.
+        """
+        files = self._parse_source_files(source_code_json_str)
+
+        # 1. Получаем абсолютный, канонический путь к временной папке (один раз)
+        safe_temp_dir = os.path.realpath(temp_dir)
+        safe_prefix = safe_temp_dir + os.sep
+        logger.debug("Writing %s file(s) to: %s", len(files), safe_temp_dir)
+
+        paths = []
+        dirs = set()
+        for relative_path, content in files:
+            # 2. Формируем полный путь. normpath - чистая работа со строкой (без lstat);
+            # симлинков во временной папке нет, т.к. все файлы в ней создаем мы сами
+            full_path = os.path.normpath(os.path.join(safe_temp_dir, relative_path))
+
+            # 3. ПРОВЕРКА БЕЗОПАСНОСТИ:
+            # Убеждаемся, что итоговый путь (full_path) 
+            # все еще находится ВНУТРИ нашей временной папки (safe_temp_dir).
+            # Сравниваем с префиксом, оканчивающимся на разделитель: '/tmp/ab' не должен пройти для '/tmp/a'
+            if not full_path.startswith(safe_prefix):
+                logger.error("SECURITY ALERT: Path Traversal attempt detected. Blocked path: %s", relative_path)
+                # Прерываем всю операцию (до записи каких-либо файлов)
+                raise PermissionError(f"Path Traversal attempt detected: {relative_path}")
+
+            paths.append((full_path, content.encode('utf-8')))
+            dirs.add(os.path.dirname(full_path))
+
+        # 4. Создаем каждый каталог один раз
+        for directory in dirs:
+            os.makedirs(directory, exist_ok=True)
+
+        # 5. Записываем файлы параллельно, не блокируя event loop
+        await asyncio.gather(*(
+            asyncio.to_thread(self._write_source_file, full_path, data)
+            for full_path, data in paths
+        ))
+        return safe_temp_dir
+
 
     async def analyze_source_code(self, source_code_json: str) -> Dict[str, Any]:
         """
         Анализирует исходный код с помощью Slither.
         """
+        source_hash = None
+        if self._result_cache is not None:
+            source_hash = source_code_hash(source_code_json)
+            cached_report = self._result_cache.get(source_hash)
+            if cached_report is not None:
+                logger.info("Slither report found in cache. Skipping Slither run.")
+                # Каждый раз новый dict: вызывающий код может изменять отчет
+                return orjson.loads(cached_report)
+
         # Используем NamedTemporaryFile для более безопасного создания временных каталогов
         with tempfile.TemporaryDirectory() as temp_dir:
+            sources_dir = os.path.join(temp_dir, _SOURCES_DIR)
+            out_path = os.path.join(temp_dir, _SLITHER_OUTPUT_FILE)
             try:
-                root_path_for_slither = self._prepare_source_files(temp_dir, source_code_json)
-                logger.info(f"Prepared source files for Slither in: {root_path_for_slither}")
+                os.mkdir(sources_dir)
+                root_path_for_slither = await self._prepare_source_files(sources_dir, source_code_json)
+                logger.info("Prepared source files for Slither in: %s", root_path_for_slither)
             except (ValueError, PermissionError) as e: # Ловим наши ошибки валидации
-                logger.error(f"Failed to prepare source files: {e}")
+                logger.error("Failed to prepare source files: %s", e)
                 return {"success": False, "error": f"Failed to prepare source files: {e}", "results": {}}
             except Exception as e: # Ловим все остальные ошибки (напр. I/O)
-                logger.error(f"Unexpected error preparing source files: {e}", exc_info=True)
+                logger.error("Unexpected error preparing source files: %s", e, exc_info=True)
                 return {"success": False, "error": f"Unexpected error preparing files: {e}", "results": {}}
             
             # Запускаем Slither
             try:
-                 slither_result = await self._run_slither(root_path_for_slither)
-                 return slither_result
+                 solc_version = self._select_solc_version(self._parse_source_files(source_code_json))
+                 slither_result = await self._run_slither(root_path_for_slither, out_path, solc_version)
             except Exception as e:
-                 logger.error(f"Error running Slither process: {e}", exc_info=True)
+                 logger.error("Error running Slither process: %s", e, exc_info=True)
                  return {"success": False, "error": f"Error running Slither process: {e}", "results": {}}
 
-    def classify_slither_report(self, slither_json: Dict[str, Any]) -> Tuple[int, str]:
+        # Кэшируем только успешные прогоны: ошибки могут быть временными (solc, окружение)
+        if source_hash is not None and slither_result.get('success'):
+            try:
+                self._result_cache[source_hash] = orjson.dumps(slither_result)
+            except ValueError as e: # Отчет больше, чем помещается в кэш
+                logger.debug("Slither report not cached: %s", e)
+
+        return slither_result
+
+    def classify_slither_report(self, slither_json: Dict[str, Any]) -> Tuple[int, Callable[[], bytes]]:
         """
         Классифицирует JSON-отчет Slither по 5-уровневой шкале.
+
+        :return: (статус, функция без аргументов, возвращающая отчет в виде JSON (bytes от orjson)).
+                 Сериализация выполняется только если отчет действительно нужен вызывающему.
         """
-        slither_json_with_provider = slither_json.copy() 
-        slither_json_with_provider["provider"] = "Slither"
-        report_str = json.dumps({"slither": slither_json_with_provider})
+        slither_json_with_provider = {**slither_json, "provider": "Slither"}
+
+        def report_str() -> bytes:
+            return orjson.dumps({"slither": slither_json_with_provider})
         
         if not slither_json.get('success', False):
             return (1, report_str) 
@@ -155,13 +562,20 @@ class SlitherAnalyzer:
         if not detectors:
             return (5, report_str) 
 
-        impacts = set(d.get('impact') for d in detectors)
-        
-        if 'High' in impacts:
-            return (3, report_str)
-        if 'Medium' in impacts:
+        # Один проход; High - худший вариант, дальше можно не смотреть
+        has_medium = has_low = False
+        for detector in detectors:
+            impact = detector.get('impact')
+            if impact == 'High':
+                return (3, report_str)
+            if impact == 'Medium':
+                has_medium = True
+            elif impact == 'Low':
+                has_low = True
+
+        if has_medium:
             return (2, report_str)
-        if 'Low' in impacts:
+        if has_low:
             return (4, report_str)
             
-        return (5, report_str)
\ No newline at end of file
+        return (5, report_str)
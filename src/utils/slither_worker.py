@@ -0,0 +1,71 @@
+"""
+Долгоживущий процесс-обработчик Slither (используется SlitherWorkerPool).
+
+Slither импортируется один раз при старте процесса, а не на каждый контракт.
+Протокол - JSON-строки через stdin/stdout:
+    запрос:  {"cwd": "<каталог с исходниками>", "out": "<путь для JSON-отчета>", "args": [<доп. аргументы CLI>]}
+    ответ:   {"returncode": <int>, "stderr": "<вывод в stderr>"}
+Сам отчет Slither пишет в файл "out", как и при запуске через CLI.
+
+Скрипт запускается по пути к файлу и не зависит от пакета src.
+"""
+import os
+import sys
+import tempfile
+
+import orjson
+
+# Ограничение на размер stderr в ответе: полный вывод solc бывает очень большим
+_MAX_STDERR_BYTES = 64 * 1024
+
+
+def _run_job(slither_main, cwd: str, out_path: str, args: list) -> dict:
+    """
+    Выполняет один прогон Slither (эквивалент `slither . --json out_path [args]` в каталоге cwd).
+    stderr (включая вывод solc) на время прогона перенаправляется во временный файл.
+    """
+    returncode = 0
+    saved_stderr_fd = os.dup(2)
+    with tempfile.TemporaryFile() as stderr_file:
+        sys.stderr.flush()
+        os.dup2(stderr_file.fileno(), 2)
+        try:
+            os.chdir(cwd)
+            sys.argv = ['slither', '.', '--json', out_path, *args]
+            slither_main()
+        except SystemExit as e: # CLI Slither всегда завершается через sys.exit()
+            returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException as e:
+            print(f"Slither worker error: {e!r}", file=sys.stderr)
+            returncode = 1
+        finally:
+            sys.stderr.flush()
+            os.dup2(saved_stderr_fd, 2)
+            os.close(saved_stderr_fd)
+
+        stderr_file.seek(0)
+        stderr = stderr_file.read(_MAX_STDERR_BYTES).decode('utf-8', errors='ignore')
+
+    return {"returncode": returncode, "stderr": stderr}
+
+
+def main() -> None:
+    from slither.__main__ import main as slither_main
+
+    # stdout занят протоколом: все, что Slither печатает в stdout, уходит в /dev/null
+    protocol_out = os.fdopen(os.dup(1), 'wb')
+    devnull_fd = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull_fd, 1)
+    os.close(devnull_fd)
+
+    for line in sys.stdin.buffer:
+        if not line.strip():
+            continue
+        request = orjson.loads(line)
+        response = _run_job(slither_main, request['cwd'], request['out'], request.get('args', []))
+        protocol_out.write(orjson.dumps(response) + b'\n')
+        protocol_out.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+import orjson
+
+from src.providers.openai_compatible_api_client import OpenAICompatibleClient
+from src.utils.llm_airdrop_analyzer import LLMAirdropAnalyzer, NOT_AIRDROP
+
+API_URL = "https://llm.test/v1/chat/completions"
+
+AIRDROP_CONTENT = orjson.dumps({"eligibility_function_abi": {"name": "isEligible"}}).decode()
+NOT_AIRDROP_CONTENT = orjson.dumps({"eligibility_function_abi": None}).decode()
+
+
+def _result_line(custom_id, content):
+    return {
+        "custom_id": custom_id,
+        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}},
+        "error": None,
+    }
+
+
+def _error_line(custom_id):
+    return {
+        "custom_id": custom_id,
+        "response": {"status_code": 400, "body": {"error": {"message": "bad request"}}},
+        "error": None,
+    }
+
+
+def _jsonl(lines):
+    return b"".join(orjson.dumps(line) + b"\n" for line in lines)
+
+
+def _make_analyzer(batch, files):
+    """Анализатор с OpenAI-клиентом поверх mock-транспорта Files/Batches API."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        path = request.url.path
+        if request.method == "POST" and path == "/v1/files":
+            return httpx.Response(200, json={"id": "file-input"})
+        if request.method == "POST" and path == "/v1/batches":
+            return httpx.Response(200, json={"id": "batch-1"})
+        if request.method == "GET" and path == "/v1/batches/batch-1":
+            return httpx.Response(200, json=batch)
+        if request.method == "GET" and path.startswith("/v1/files/") and path.endswith("/content"):
+            file_id = path[len("/v1/files/"):-len("/content")]
+            return httpx.Response(200, content=files[file_id])
+        return httpx.Response(404)
+
+    client = OpenAICompatibleClient(
+        base_url=API_URL,
+        api_key="key",
+        model="model",
+        semaphore=asyncio.Semaphore(1),
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return LLMAirdropAnalyzer(client=client), requests
+
+
+def test_batch_results_include_failed_requests():
+    batch = {"id": "batch-1", "status": "completed", "output_file_id": "file-out", "error_file_id": "file-err"}
+    files = {
+        "file-out": _jsonl([_result_line("a", AIRDROP_CONTENT), _result_line("b", NOT_AIRDROP_CONTENT)]),
+        "file-err": _jsonl([_error_line("c")]),
+    }
+    analyzer, requests = _make_analyzer(batch, files)
+
+    async def run():
+        batch_id = await analyzer.submit_batch([
+            ("a", '{"source": "contract A {}"}', "[]"),
+            ("b", '{"source": "contract B {}"}', "[]"),
+            ("c", '{"source": "contract C {}"}', "[]"),
+        ])
+        return batch_id, await analyzer.wait_for_batch(batch_id, poll_interval=0)
+
+    batch_id, results = asyncio.run(run())
+
+    assert batch_id == "batch-1"
+    assert results["a"] == {"eligibility_function_abi": {"name": "isEligible"}}
+    assert results["b"] is NOT_AIRDROP
+    assert "c" in results and results["c"] is None
+
+    # Входной JSONL содержит все запросы с моделью и chat-эндпоинтом
+    upload = next(r for r in requests if r.url.path == "/v1/files")
+    assert upload.content.count(b'"custom_id"') == 3
+    assert b'"url":"/v1/chat/completions"' in upload.content
+
+
+def test_batch_without_output_file_returns_errors():
+    batch = {"id": "batch-1", "status": "completed", "output_file_id": None, "error_file_id": "file-err"}
+    files = {"file-err": _jsonl([_error_line("a"), _error_line("b")])}
+    analyzer, _ = _make_analyzer(batch, files)
+
+    results = asyncio.run(analyzer.wait_for_batch("batch-1", poll_interval=0))
+
+    assert results == {"a": None, "b": None}
+
+
+def test_expired_batch_returns_partial_results():
+    batch = {"id": "batch-1", "status": "expired", "output_file_id": "file-out", "error_file_id": None}
+    files = {"file-out": _jsonl([_result_line("a", AIRDROP_CONTENT)])}
+    analyzer, _ = _make_analyzer(batch, files)
+
+    results = asyncio.run(analyzer.wait_for_batch("batch-1", poll_interval=0))
+
+    assert list(results) == ["a"]
@@ -0,0 +1,52 @@
+import pytest
+
+from src.utils.slither_analyzer import SlitherAnalyzer
+
+INSTALLED = ["0.8.30", "0.8.20", "0.8.19", "0.7.6", "0.6.12", "0.5.17", "0.4.26"]
+
+
+def _select(*contents, installed=INSTALLED):
+    analyzer = SlitherAnalyzer(solc_versions=installed)
+    files = tuple((f"File{i}.sol", content) for i, content in enumerate(contents))
+    return analyzer._select_solc_version(files)
+
+
+@pytest.mark.parametrize("pragma, expected", [
+    ("^0.8.0", "0.8.30"),
+    ("^0.7.0", "0.7.6"),
+    ("^0.6.2", "0.6.12"),
+    ("^0.8.31", None),
+])
+def test_caret(pragma, expected):
+    assert _select(f"pragma solidity {pragma};") == expected
+
+
+@pytest.mark.parametrize("pragma, expected", [
+    ("0.8.19", "0.8.19"),
+    ("=0.8.19", "0.8.19"),
+    ("0.8.20", "0.8.20"),
+    ("0.8.21", None),  # Точная версия не установлена - глобальная версия
+])
+def test_exact_pin(pragma, expected):
+    assert _select(f"pragma solidity {pragma};") == expected
+
+
+@pytest.mark.parametrize("pragma, expected", [
+    (">=0.6.0 <0.8.0", "0.7.6"),
+    (">=0.4.22 <0.6.0", "0.5.17"),
+    (">=0.6.0 <=0.8.19", "0.8.19"),
+    (">= 0.5.0 < 0.7.0", "0.6.12"),
+])
+def test_range(pragma, expected):
+    assert _select(f"pragma solidity {pragma};") == expected
+
+
+def test_all_files_must_be_satisfied():
+    assert _select("pragma solidity ^0.8.0;", "pragma solidity 0.8.19;") == "0.8.19"
+    assert _select("pragma solidity ^0.7.0;", "pragma solidity ^0.8.0;") is None
+
+
+def test_alternatives_and_missing_pragma():
+    assert _select("pragma solidity ^0.5.0 || ^0.6.0;") == "0.6.12"
+    assert _select("contract A {}") is None
+    assert _select("pragma solidity ^0.8.0;", installed=[]) is None